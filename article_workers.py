@@ -0,0 +1,203 @@
+# CPU-bound article work - newspaper html parsing, KeyBERT keywords and VADER sentiment - and the process
+# pool that runs it, so this work stops competing for the GIL with the download/decode threads
+# the pipeline's I/O threads hand raw html to a pool of warm parse workers, and each nlp batch goes to one
+# dedicated worker that keeps the KeyBERT model loaded; CPU_WORKERS=0 runs everything in-thread as before
+# workers are spawned (not forked) so they never inherit locks held by the pipeline threads
+# a worker that dies (OOM, a crash in lxml or torch) breaks its whole pool - the pool is rebuilt and the
+# item retried once, so one bad article doesn't fail every later parse and nlp call of the run
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+CPU_WORKERS = int(os.getenv('CPU_WORKERS', str(os.cpu_count() or 1)))  # parse processes, 0 = no pool
+DEBUG_MODE = os.getenv('DEBUG_MODE', 'false').lower() == 'true'
+
+# per-process state, built once per worker by the initializers (or on first in-thread use)
+_config = None
+_analyzer = None
+
+def _newspaper_config():
+    global _config
+    if _config is None:
+        from newspaper import Config
+        _config = Config()
+        _config.enable_image_fetching = False  # faster without images!
+    return _config
+
+def _sentiment_analyzer():
+    global _analyzer
+    if _analyzer is None:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+def _warm_parse_worker():
+    import newspaper  # noqa: F401 - pays the lxml/nltk import cost at startup instead of on the first article
+    _newspaper_config()
+
+def _warm_nlp_worker():
+    _sentiment_analyzer()
+
+def _ready(_=None):
+    return os.getpid()
+
+# parse downloaded html with newspaper; the result is shared by every term through article_registry
+# html arrives as the str/bytes the session downloaded - newspaper skips its own download when given input_html
+def parse_article_html(url, html):
+    from newspaper import Article
+    try:
+        article = Article(url, config=_newspaper_config())
+        article.download(input_html=html)
+
+        # check if download succeeded - FIXED: Use try/except instead of download_exception
+        if not article.html or article.html.strip() == '':
+            if DEBUG_MODE:
+                print(f"  ---Download failed for {url[:50]}... (empty HTML)")
+            return None
+
+        #parse article, extract keywords
+        article.parse()
+        keywords = article.keywords if article.keywords else []
+
+        # extract content
+        summary = article.summary if article.summary else article.text[:500]
+
+        # skip empty content
+        if not summary or len(summary.strip()) < 50:
+            if DEBUG_MODE:
+                print(f"  ---Empty content for {url[:50]}...")
+            return None
+
+        return {
+            'text': article.text,
+            'text_length': len(article.text) if article.text else 0,
+            'summary': summary,
+            'keywords': keywords,
+            'publish_date': article.publish_date,
+            'canonical_link': article.canonical_link or None,  # rel=canonical / og:url, for dedup
+        }
+    except Exception as e:
+        if DEBUG_MODE:
+            print(f"  ---error parsing {url[:50]}...: {e}")
+        return None
+
+# one nlp batch: KeyBERT keywords for the texts newspaper found none for, VADER for every title + summary
+# timings and keyword stats come back with the results, since a worker's run_stats never reach the parent
+def analyze_batch(keyword_texts, sentiment_texts):
+    from utils import keyword_extractor
+    result = {'keywords': None, 'keyword_error': None, 'keyword_seconds': 0.0}
+    if keyword_texts:
+        start = time.perf_counter()
+        try:
+            result['keywords'] = keyword_extractor.extract(keyword_texts)
+        except Exception as e:
+            result['keyword_error'] = str(e)
+        result['keyword_seconds'] = time.perf_counter() - start
+
+    analyzer = _sentiment_analyzer()
+    sentiments = []
+    vader_seconds = []
+    for text in sentiment_texts:
+        start = time.perf_counter()
+        sentiments.append(analyzer.polarity_scores(text))
+        vader_seconds.append(time.perf_counter() - start)
+    result.update(sentiment=sentiments, vader_seconds=vader_seconds, keyword_stats=keyword_extractor.stats())
+    return result
+
+class ArticleWorkers:
+    def __init__(self, workers=CPU_WORKERS):
+        self.workers = max(workers, 0)
+        self._parse_pool = None
+        self._nlp_pool = None
+        self._lock = threading.Lock()
+        self.startup_seconds = 0.0
+        self.keyword_stats = None
+        self.restarts = {'parse': 0, 'nlp': 0}
+        if self.workers:
+            start = time.perf_counter()
+            self._parse_pool = self._new_pool('parse')
+            self._nlp_pool = self._new_pool('nlp')
+            # start every worker now, before the pipeline threads, so startup isn't billed to the first articles
+            list(self._parse_pool.map(_ready, range(self.workers)))
+            self._nlp_pool.submit(_ready).result()
+            self.startup_seconds = time.perf_counter() - start
+            print(f"Article workers: {self.workers} parse processes + 1 nlp process ready in {self.startup_seconds:.2f}s")
+
+    def _new_pool(self, kind):
+        context = multiprocessing.get_context('spawn')
+        if kind == 'parse':
+            return ProcessPoolExecutor(self.workers, mp_context=context, initializer=_warm_parse_worker)
+        return ProcessPoolExecutor(1, mp_context=context, initializer=_warm_nlp_worker)
+
+    # a broken pool is replaced once, by whichever thread sees it first - the others retry on the new one
+    def _restart(self, kind, broken):
+        attr = f'_{kind}_pool'
+        with self._lock:
+            if getattr(self, attr) is not broken:
+                return
+            setattr(self, attr, self._new_pool(kind))
+            self.restarts[kind] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+        print(f"Article workers: a {kind} process died - restarted the {kind} pool")
+
+    # fn(*args) in the kind's pool, retried once on a rebuilt pool if a worker died under it
+    def _call(self, kind, fn, *args):
+        for attempt in range(2):
+            pool = getattr(self, f'_{kind}_pool')
+            try:
+                return pool.submit(fn, *args).result()
+            except BrokenProcessPool:
+                self._restart(kind, pool)
+                if attempt:
+                    raise
+
+    def parse(self, url, html):
+        if self._parse_pool is None:
+            return parse_article_html(url, html)
+        return self._call('parse', parse_article_html, url, html)
+
+    def analyze(self, keyword_texts, sentiment_texts):
+        if self._nlp_pool is None:
+            result = analyze_batch(keyword_texts, sentiment_texts)
+        else:
+            result = self._call('nlp', analyze_batch, keyword_texts, sentiment_texts)
+        with self._lock:
+            self.keyword_stats = result['keyword_stats']
+        return result
+
+    def shutdown(self):
+        for pool in (self._parse_pool, self._nlp_pool):
+            if pool is not None:
+                pool.shutdown()
+        self._parse_pool = self._nlp_pool = None
+
+    def stats(self):
+        return {'cpu_workers': self.workers, 'startup_seconds': round(self.startup_seconds, 2),
+                'pool_restarts': dict(self.restarts), 'keyword_extractor': self.keyword_stats}
+
+    # keyword stats live in whichever process ran KeyBERT - the last batch reported them back
+    def print_stats(self):
+        stats = self.keyword_stats
+        if not stats or not stats['batches']:
+            print("KeyBERT: not used this run")
+        else:
+            print(f"KeyBERT: model load {stats['model_load_seconds']:.2f}s, {stats['docs']} docs in {stats['batches']} batches, "
+                  f"{stats['batch_seconds']:.2f}s total ({stats['docs'] / max(stats['batch_seconds'], 1e-9):.1f} docs/s)")
+        if self.workers:
+            print(f"Article workers: {self.workers} parse processes, startup {self.startup_seconds:.2f}s, "
+                  f"{self.restarts['parse']} parse / {self.restarts['nlp']} nlp pool restarts")
+
+_article_workers = None
+_article_workers_lock = threading.Lock()
+
+# shared per-process pool, started on first use
+def get_article_workers():
+    global _article_workers
+    with _article_workers_lock:
+        if _article_workers is None:
+            _article_workers = ArticleWorkers()
+        return _article_workers
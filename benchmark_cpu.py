@@ -0,0 +1,78 @@
+# CPU SCALING BENCHMARK
+# parse + KeyBERT + VADER throughput of the article worker pool (article_workers.py) for 0 (in-thread) .. N processes,
+# on synthetic article pages - no network, no google stub; shows how far parsing scales with cores
+# python benchmark_cpu.py --articles 200 --max-workers 4
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark_pipeline import synthetic_article_html
+
+def run(workers, pages, batch_size):
+    from article_workers import ArticleWorkers
+    pool = ArticleWorkers(workers)
+    try:
+        start = time.perf_counter()
+        # the pipeline's parse stage runs one submitting thread per worker process
+        with ThreadPoolExecutor(max(workers, 1)) as threads:
+            contents = list(threads.map(lambda page: pool.parse(*page), pages))
+        parse_seconds = time.perf_counter() - start
+
+        parsed = [c for c in contents if c]
+        nlp_start = time.perf_counter()
+        keyword_error = None
+        for i in range(0, len(parsed), batch_size):
+            batch = parsed[i:i + batch_size]
+            # keyword texts as in the nlp stage - KeyBERT is the bulk of the nlp cost
+            result = pool.analyze([c['text'] for c in batch if c['text']], [c['summary'] for c in batch])
+            keyword_error = keyword_error or result['keyword_error']
+        nlp_seconds = time.perf_counter() - nlp_start
+        wall_seconds = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+    return {
+        'workers': workers,
+        'parsed': len(parsed),
+        'startup_seconds': round(pool.startup_seconds, 2),
+        'parse_seconds': round(parse_seconds, 2),
+        'nlp_seconds': round(nlp_seconds, 2),
+        'keyword_error': keyword_error,
+        'articles_per_sec': round(len(pages) / wall_seconds, 2) if wall_seconds else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Article parse/NLP throughput against worker process count')
+    parser.add_argument('--articles', type=int, default=200)
+    parser.add_argument('--article-kb', type=int, default=40)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    pages = [(f"http://pub{n % 20}.com/story/{n}", synthetic_article_html(f"/story/{n}", args.article_kb, args.seed))
+             for n in range(args.articles)]
+    print(f"Benchmarking article workers: {args.articles} pages of ~{args.article_kb} KB, 0..{args.max_workers} processes")
+
+    results = []
+    for workers in range(args.max_workers + 1):
+        result = run(workers, pages, args.batch_size)
+        results.append(result)
+        baseline = results[0]['articles_per_sec'] or 1e-9
+        print(f"  {workers} workers: {result['articles_per_sec']:7.2f} articles/sec ({result['articles_per_sec'] / baseline:.2f}x) "
+              f"parse {result['parse_seconds']:.2f}s, nlp {result['nlp_seconds']:.2f}s, "
+              f"startup {result['startup_seconds']:.2f}s, {result['parsed']} parsed")
+        if result['keyword_error']:
+            print(f"    KeyBERT failed ({result['keyword_error']}) - nlp time is VADER only")
+        sys.stdout.flush()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+# offline end-to-end throughput benchmark for the scraping pipeline
+# a local stub server stands in for google news rss, the url decoder and the publishers, with configurable
+# latency, error rate and 429 bursts; the real process_enterprise_articles / process_emerging_articles path
+# runs against it and the harness reports articles/sec, time per stage and peak RSS
+# every stub decision (latency, errors, overlap between terms) is seeded, so runs are comparable and
+# --min-articles-per-sec can be used as a regression gate
+# usage: python benchmark_pipeline.py [--risk-type enterprise] [--terms 20] [--latency-ms 50] [--min-articles-per-sec 2]
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, quote
+
+WORDS = ('market risk supply chain regulator bank outage breach inflation lawsuit energy climate policy '
+         'investors customers operations report quarter growth pressure exposure analysts board').split()
+SENTENCES = ('The {} said that the {} would have to be reviewed because of the {} and the {}.',
+             'Analysts told us they are watching how the {} will affect the {} over the next {} as {} rises.',
+             'It is not clear whether the {} can be kept under control while the {} and {} are still {}.',
+             'Officials said there was no sign that the {} had spread to the {}, but the {} remains {}.')
+
+# filler article page; newspaper scores paragraphs by stop words, so the text has to read like prose
+def synthetic_article_html(path, article_kb, seed=0):
+    rng = random.Random(f"{seed}:{path}:body")
+    paragraphs = []
+    size = 0
+    while size < article_kb * 1024:
+        text = ' '.join(rng.choice(SENTENCES).format(*(rng.choice(WORDS) for _ in range(4))) for _ in range(6))
+        paragraphs.append(f"<p>{text}</p>")
+        size += len(text) + 7
+    nav = ''.join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(40))
+    return (f"<html><head><title>Story {path}</title><meta charset=\"utf-8\"></head><body>"
+            f"<nav><ul>{nav}</ul></nav><article><h1>Story {path}</h1>{''.join(paragraphs)}</article>"
+            f"<footer>Copyright</footer></body></html>").encode()
+
+# STUB SERVER
+# one handler for everything: it is both the google endpoints (/rss/search, /decode) and the http proxy the
+# publisher downloads go through (proxied requests carry the absolute url in the request line)
+def make_handler(options):
+    lock = threading.Lock()
+    counters = {'google': 0}
+
+    def seeded(*parts):
+        return random.Random(f"{options['seed']}:" + ':'.join(str(p) for p in parts))
+
+    def sleep_latency(rng, base_ms):
+        if base_ms:
+            time.sleep(base_ms * rng.uniform(0.5, 1.5) / 1000)
+
+    # every `burst_every` google requests, the next `burst_length` ones get a 429
+    def google_throttled():
+        with lock:
+            counters['google'] += 1
+            n = counters['google']
+        every = options['burst_every']
+        return bool(every) and n % every < options['burst_length']
+
+    def article_id(query, n):
+        # a share of each term's results are stories every term sees (exercises the article registry)
+        if seeded(query, n, 'shared').random() < options['overlap']:
+            return f"s{seeded(query, n, 'pick').randrange(options['shared_pool'])}"
+        return hashlib.sha1(f"{query}:{n}".encode()).hexdigest()[:12]
+
+    # an OR query (query_planner.py batches) interleaves its members' own feeds, so like google it returns
+    # fewer results per term; --title-match sets the share of titles that repeat the term
+    def rss_body(query, start):
+        pub_date = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(time.time() - 86400))
+        members = [member.strip()[1:-1] for member in query.split(' OR ')] if ' OR ' in query else [query]
+        items = []
+        for n in range(start, start + options['items_per_term']):
+            member, member_n = members[n % len(members)], n // len(members)
+            aid = article_id(member, member_n)
+            publisher = int(hashlib.sha1(aid.encode()).hexdigest(), 16) % options['publishers']
+            if seeded(member, member_n, 'title').random() < options.get('title_match', 1.0):
+                title = f"{member.title()} story {aid} puts pressure on markets"
+            else:
+                title = f"Story {aid} puts pressure on markets"
+            items.append(
+                f"<item><title>{title}</title><link>https://news.google.com/rss/articles/{aid}</link>"
+                f"<guid>{aid}</guid><pubDate>{pub_date}</pubDate>"
+                f"<source url=\"http://pub{publisher}.com\">Publisher {publisher}</source></item>"
+            )
+        return f"<rss><channel>{''.join(items)}</channel></rss>".encode()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status, body, content_type='text/html; charset=utf-8', headers=None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path.startswith('/rss/search'):
+                sleep_latency(seeded(self.path, 'latency'), options['rss_latency_ms'])
+                if google_throttled():
+                    return self._send(429, b'rate limited', headers={'Retry-After': str(options['retry_after'])})
+                # a feed's items only depend on its url, so the url is the ETag - repeat runs on a kept
+                # CACHE_DIR are answered 304 (see ScraperSession.fetch_rss_items)
+                etag = f'"{hashlib.sha1(self.path.encode()).hexdigest()[:16]}"'
+                if self.headers.get('If-None-Match') == etag:
+                    return self._send(304, b'', headers={'ETag': etag})
+                term = query.get('q', [''])[0].split(' when:')[0]
+                return self._send(200, rss_body(term, int(query.get('start', ['0'])[0])), 'application/xml',
+                                  headers={'ETag': etag})
+            if url.path.startswith('/decode'):
+                aid = query.get('id', [''])[0]
+                sleep_latency(seeded(aid, 'decode'), options['decode_latency_ms'])
+                if google_throttled():
+                    return self._send(429, b'rate limited')
+                publisher = int(hashlib.sha1(aid.encode()).hexdigest(), 16) % options['publishers']
+                return self._send(200, json.dumps({'status': True, 'decoded_url': f"http://pub{publisher}.com/news/{aid}"}).encode(),
+                                  'application/json')
+            # publisher page
+            rng = seeded(self.path, 'article')
+            sleep_latency(rng, options['article_latency_ms'])
+            if rng.random() < options['error_rate']:
+                return self._send(500, b'server error')
+            return self._send(200, synthetic_article_html(url.path, options['article_kb'], options['seed']))
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+def serve_stub(port, options, ready):
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(options))
+    server.daemon_threads = True
+    ready.set()
+    server.serve_forever()
+
+# the real decoder only talks https to news.google.com, so the benchmark swaps in a client with the same
+# contract that asks the stub instead - failures come back inside the message like googlenewsdecoder does
+def make_stub_decoder(base_url):
+    import requests
+    session = requests.Session()
+
+    def stub_decoder(encoded_url):
+        aid = encoded_url.rsplit('/', 1)[-1]
+        try:
+            response = session.get(f"{base_url}/decode?id={quote(aid)}", timeout=10)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            return {'status': False, 'message': f"Error in decode_google_news_url: {e}"}
+    return stub_decoder
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--risk-type', choices=['enterprise', 'emerging', 'all'], default='enterprise')
+    arg_parser.add_argument('--terms', type=int, default=20)
+    arg_parser.add_argument('--items-per-term', type=int, default=10)
+    arg_parser.add_argument('--overlap', type=float, default=0.3, help='share of results shared between terms')
+    arg_parser.add_argument('--shared-pool', type=int, default=20, help='number of stories the shared results come from')
+    arg_parser.add_argument('--publishers', type=int, default=15)
+    arg_parser.add_argument('--title-match', type=float, default=1.0, help='share of rss titles that contain the search term')
+    arg_parser.add_argument('--article-kb', type=int, default=40)
+    arg_parser.add_argument('--latency-ms', type=float, default=None, help='shortcut that sets all three latencies')
+    arg_parser.add_argument('--rss-latency-ms', type=float, default=150)
+    arg_parser.add_argument('--decode-latency-ms', type=float, default=200)
+    arg_parser.add_argument('--article-latency-ms', type=float, default=300)
+    arg_parser.add_argument('--error-rate', type=float, default=0.05, help='share of article downloads that fail')
+    arg_parser.add_argument('--burst-every', type=int, default=60, help='google requests between 429 bursts (0 = never)')
+    arg_parser.add_argument('--burst-length', type=int, default=3)
+    arg_parser.add_argument('--retry-after', type=float, default=0.5)
+    arg_parser.add_argument('--google-qps', type=float, default=10.0, help='starting pace for the google rate limiter')
+    arg_parser.add_argument('--fetch-engine', choices=['async', 'thread'], default='async',
+                            help='publisher download path (FETCH_ENGINE)')
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--port', type=int, default=8799)
+    arg_parser.add_argument('--min-articles-per-sec', type=float, default=None, help='exit 1 when throughput is below this')
+    arg_parser.add_argument('--json', help='also write the results to this file')
+    arg_parser.add_argument('--verbose', action='store_true', help='show the pipeline output')
+    args = arg_parser.parse_args()
+    if args.latency_ms is not None:
+        args.rss_latency_ms = args.decode_latency_ms = args.article_latency_ms = args.latency_ms
+
+    options = {
+        'seed': args.seed, 'items_per_term': args.items_per_term, 'overlap': args.overlap,
+        'shared_pool': args.shared_pool, 'publishers': args.publishers, 'article_kb': args.article_kb,
+        'title_match': args.title_match,
+        'rss_latency_ms': args.rss_latency_ms, 'decode_latency_ms': args.decode_latency_ms,
+        'article_latency_ms': args.article_latency_ms, 'error_rate': args.error_rate,
+        'burst_every': args.burst_every, 'burst_length': args.burst_length, 'retry_after': args.retry_after,
+    }
+    # stub in its own process so its work doesn't show up in the pipeline's cpu time or peak RSS
+    ready = multiprocessing.Event()
+    stub = multiprocessing.Process(target=serve_stub, args=(args.port, options, ready), daemon=True)
+    stub.start()
+    ready.wait(10)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    # configure the scraper before its modules read their env constants; cold caches so every run does the same work
+    cache_dir = tempfile.mkdtemp(prefix='benchmark_cache_')
+    os.environ.update({
+        'HTTP_PROXY': base_url, 'http_proxy': base_url, 'NO_PROXY': '', 'no_proxy': '',
+        'GOOGLE_NEWS_RSS_URL': f"{base_url}/rss/search", 'CACHE_DIR': cache_dir,
+        'GOOGLE_TARGET_QPS': str(args.google_qps), 'GOOGLE_MAX_QPS': str(max(args.google_qps * 2, 8.0)),
+        'PIPELINE_REPORT_SECONDS': '0', 'FETCH_ENGINE': args.fetch_engine,
+    })
+    import pandas as pd
+    import utils
+    import risk_engine
+    from run_report import run_stats
+    from source_registry import SourceRegistry
+    utils.new_decoderv1 = make_stub_decoder(base_url)
+
+    # 'all' runs every risk list in one process on the same terms, as risk_engine.py --lists would
+    risk_lists = list(risk_engine.RISK_LISTS.values()) if args.risk_type == 'all' else [risk_engine.RISK_LISTS[args.risk_type]]
+    runs = [(risk_list, pd.DataFrame({
+        risk_list.risk_id_col: [n // 3 + 1 for n in range(args.terms)],
+        'SEARCH_TERM_ID': list(range(1, args.terms + 1)),
+        'SEARCH_TERMS': [f"{random.Random(args.seed + n).choice(WORDS)} {WORDS[n % len(WORDS)]} {n}" for n in range(args.terms)],
+    }), utils.ExistingLinkIndex()) for risk_list in risk_lists]
+
+    sources = SourceRegistry(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+    print(f"Benchmarking {args.risk_type} pipeline: {args.terms} terms x {args.items_per_term} items against {base_url}")
+    output = sys.stdout if args.verbose else io.StringIO()
+    session = utils.ScraperSession()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        articles = risk_engine.process_risk_lists(runs, session, sources)
+    wall_seconds = time.perf_counter() - start
+    stub.terminate()
+    fetch_engine = session.fetch_engine.stats() if session.fetch_engine else {'engine': 'thread'}
+    session.close()
+    article_workers = risk_engine.get_article_workers()
+    article_workers.shutdown()
+
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kilobytes on linux
+    if sys.platform == 'darwin':
+        peak_rss_mb /= 1024  # bytes on macos
+    articles = sum(len(df) for df in articles.values())
+    results = {
+        'risk_type': args.risk_type,
+        'options': options,
+        'terms': args.terms,
+        'articles': articles,
+        'wall_seconds': round(wall_seconds, 2),
+        'articles_per_sec': round(articles / wall_seconds, 3) if wall_seconds else 0.0,
+        'peak_rss_mb': round(peak_rss_mb, 1),
+        'stages': run_stats.stage_stats(),
+        'counters': dict(sorted(run_stats.counters.items())),
+        'pipeline': run_stats.sections.get('pipeline', {}),
+        'query_planner': run_stats.sections.get('query_planner', {}),
+        'google_rate_limiter': utils.google_rate_limiter.stats(),
+        'article_registry': utils.article_registry.stats(),
+        'article_workers': article_workers.stats(),
+        'fetch_engine': fetch_engine,
+    }
+
+    print(f"{articles} articles in {wall_seconds:.2f}s = {results['articles_per_sec']:.2f} articles/sec, "
+          f"peak RSS {results['peak_rss_mb']:.0f} MB")
+    run_stats.print_stats()
+    print("Pipeline stages (busy = summed worker time):")
+    for name, stats in results['pipeline'].items():
+        print(f"    {name:<13} in={stats['items_in']:<5} out={stats['items_out']:<5} busy={stats['busy_seconds']:.1f}s "
+              f"max queue={stats['max_queue_depth']}" + (f" in flight max={stats['max_in_flight']}" if stats.get('max_in_flight') else ""))
+    if fetch_engine['engine'] == 'async':
+        print(f"Fetch engine: async, {fetch_engine['requests']} requests, peak {fetch_engine['peak_in_flight']} in flight "
+              f"across {fetch_engine['hosts']} hosts")
+    else:
+        print(f"Fetch engine: thread ({os.environ.get('DOWNLOAD_WORKERS', '9')} download workers)")
+    planner = results['query_planner']
+    if planner:
+        print(f"Query planner: {planner['terms']} terms -> {planner['queries']} queries, saved "
+              f"{planner['rss_requests_saved']} rss + {planner['decode_requests_saved']} decoder google requests")
+    limiter = results['google_rate_limiter']
+    print(f"Google stub: {limiter['requests']} requests, {limiter['throttles']} throttles, {limiter['wait_seconds']:.1f}s waited")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.min_articles_per_sec is not None and results['articles_per_sec'] < args.min_articles_per_sec:
+        print(f"REGRESSION: {results['articles_per_sec']:.2f} articles/sec is below the "
+              f"{args.min_articles_per_sec:.2f} threshold")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# scale benchmark for save_results / storage.AppendOnlyCsvStore
+# builds output tables of growing size and times a typical daily save against each one;
+# append-only save time should stay flat as the table grows (the legacy read-concat-rewrite grows linearly)
+# usage: python benchmark_storage.py [--sizes 10000 100000 1000000] [--daily-rows 500] [--legacy]
+
+import argparse
+import csv
+import datetime as dt
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+import pandas as pd
+from storage import AppendOnlyCsvStore
+
+COLUMNS = ['RISK_ID', 'SEARCH_TERM_ID', 'GOOGLE_INDEX', 'TITLE', 'LINK', 'PUBLISHED_DATE', 'SUMMARY', 'KEYWORDS',
+           'SENTIMENT_COMPOUND', 'SENTIMENT', 'SOURCE', 'SOURCE_URL', 'PAYWALLED', 'CREDIBILITY_TYPE', 'QUALITY_SCORE',
+           'SCORE_RELEVANCE', 'SCORE_RECENCY', 'SCORE_LENGTH_150', 'SCORE_LENGTH_500', 'SCORE_WHITELIST_BONUS',
+           'SCORE_CLICKBAIT_PENALTY']
+
+def make_rows(start_id, count, rng, max_age_days=100):
+    now = dt.datetime.now()
+    rows = []
+    for n in range(start_id, start_id + count):
+        link = f"https://publisher{n % 500}.com/news/{n}"
+        rows.append({
+            'RISK_ID': rng.randint(1, 60), 'SEARCH_TERM_ID': rng.randint(1, 140), 'GOOGLE_INDEX': rng.randint(1, 100),
+            'TITLE': f"Synthetic headline number {n} about risk", 'LINK': link,
+            'PUBLISHED_DATE': (now - dt.timedelta(minutes=rng.randint(0, max_age_days * 1440))).strftime('%Y-%m-%d %H:%M:%S'),
+            'SUMMARY': "Lorem ipsum dolor sit amet " * 15, 'KEYWORDS': 'risk, markets, supply chain',
+            'SENTIMENT_COMPOUND': round(rng.uniform(-1, 1), 4), 'SENTIMENT': 'Neutral', 'SOURCE': f"Publisher{n % 500}",
+            'SOURCE_URL': link, 'PAYWALLED': False, 'CREDIBILITY_TYPE': 'Relevant Article', 'QUALITY_SCORE': 3,
+            'SCORE_RELEVANCE': 1, 'SCORE_RECENCY': 1, 'SCORE_LENGTH_150': 1, 'SCORE_LENGTH_500': 0,
+            'SCORE_WHITELIST_BONUS': 0, 'SCORE_CLICKBAIT_PENALTY': 0,
+        })
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+# the pre-storage.py save_results logic, kept here for comparison only
+def legacy_save(df, output_path):
+    existing_df = pd.read_csv(output_path, parse_dates=['PUBLISHED_DATE'], encoding='utf-8')
+    combined_df = pd.concat([existing_df, df], ignore_index=True)
+    combined_df = combined_df.drop_duplicates(subset=['RISK_ID', 'TITLE', 'LINK'], keep='first')
+    cutoff_date = dt.datetime.now() - dt.timedelta(days=4 * 30)
+    combined_df['PUBLISHED_DATE'] = pd.to_datetime(combined_df['PUBLISHED_DATE'], errors='coerce')
+    current_df = combined_df[combined_df['PUBLISHED_DATE'] >= cutoff_date]
+    current_df.sort_values(by='PUBLISHED_DATE', ascending=False).to_csv(
+        output_path, index=False, encoding='utf-8', quoting=csv.QUOTE_MINIMAL
+    )
+
+def bench_size(size, daily_rows, runs, legacy, rng):
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = Path(tmp) / 'bench_risks_online_sentiment.csv'
+        # bulk-build the history directly, in slices to keep memory flat
+        for start in range(0, size, 200000):
+            make_rows(start, min(200000, size - start), rng).to_csv(
+                output_path, mode='a', header=start == 0, index=False, encoding='utf-8'
+            )
+
+        store = AppendOnlyCsvStore(output_path, 'bench')
+        build_start = time.perf_counter()
+        store.save(make_rows(size, 1, rng, max_age_days=1))  # first save builds the sidecar index once
+        build_seconds = time.perf_counter() - build_start
+
+        next_id = size + 1
+        timings = []
+        for _ in range(runs):
+            daily = make_rows(next_id, daily_rows, rng, max_age_days=7)
+            next_id += daily_rows
+            save_start = time.perf_counter()
+            AppendOnlyCsvStore(output_path, 'bench').save(daily)  # fresh store each time, like a new run
+            timings.append(time.perf_counter() - save_start)
+
+        legacy_seconds = None
+        if legacy:
+            daily = make_rows(next_id, daily_rows, rng, max_age_days=7)
+            legacy_start = time.perf_counter()
+            legacy_save(daily, output_path)
+            legacy_seconds = time.perf_counter() - legacy_start
+        return build_seconds, statistics.median(timings), legacy_seconds
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    arg_parser.add_argument('--daily-rows', type=int, default=500)
+    arg_parser.add_argument('--runs', type=int, default=5)
+    arg_parser.add_argument('--legacy', action='store_true', help='also time the old read-concat-rewrite save')
+    args = arg_parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'table rows':>12} {'index build':>12} {'append save':>12} {'legacy save':>12}")
+    for size in args.sizes:
+        build_seconds, save_seconds, legacy_seconds = bench_size(size, args.daily_rows, args.runs, args.legacy, rng)
+        legacy_text = f"{legacy_seconds:>11.3f}s" if legacy_seconds is not None else f"{'-':>12}"
+        print(f"{size:>12} {build_seconds:>11.3f}s {save_seconds:>11.3f}s {legacy_text}")
+
+if __name__ == '__main__':
+    main()
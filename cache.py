@@ -0,0 +1,291 @@
+# persistent on-disk caches shared by the enterprise and emerging risks scripts
+# everything lives under CACHE_DIR so CI can restore/save it between runs
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+CACHE_DIR = Path(os.getenv('CACHE_DIR', 'cache'))
+DECODE_CACHE_TTL_DAYS = int(os.getenv('DECODE_CACHE_TTL_DAYS', '30'))
+DECODE_CACHE_MAX_ENTRIES = int(os.getenv('DECODE_CACHE_MAX_ENTRIES', '100000'))
+
+# open a sqlite db that can be shared by worker threads (callers serialize access with their own lock)
+def open_cache_db(file_name):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(CACHE_DIR / file_name, check_same_thread=False, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')  # lets a second script read while another writes
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+RSS_CACHE_TTL_DAYS = float(os.getenv('RSS_CACHE_TTL_DAYS', '2'))
+RSS_CACHE_MAX_ENTRIES = int(os.getenv('RSS_CACHE_MAX_ENTRIES', '20000'))
+
+# GOOGLE NEWS DECODE CACHE
+# encoded google news link -> publisher url; the same links come back every day inside the SEARCH_DAYS window
+class DecodeCache:
+    def __init__(self, file_name='decoded_urls.sqlite', ttl_days=DECODE_CACHE_TTL_DAYS, max_entries=DECODE_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_days * 24 * 3600
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.conn = open_cache_db(file_name)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS decoded_urls ('
+            'encoded_url TEXT PRIMARY KEY, decoded_url TEXT NOT NULL, '
+            'created_at REAL NOT NULL, last_used REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_decoded_last_used ON decoded_urls (last_used)')
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0  # wall time spent on decodes + their sleeps
+        self._puts = 0
+        self.evict()
+
+    def get(self, encoded_url):
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT decoded_url, created_at FROM decoded_urls WHERE encoded_url = ?', (encoded_url,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self.conn.execute('UPDATE decoded_urls SET last_used = ? WHERE encoded_url = ?', (now, encoded_url))
+            self.conn.commit()
+            self.hits += 1
+            return row[0]
+
+    # lookup without touching counters or last_used - for checks made before deciding to decode
+    def peek(self, encoded_url):
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT decoded_url, created_at FROM decoded_urls WHERE encoded_url = ?', (encoded_url,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return row[0]
+
+    def put(self, encoded_url, decoded_url):
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO decoded_urls (encoded_url, decoded_url, created_at, last_used) VALUES (?, ?, ?, ?)',
+                (encoded_url, decoded_url, now, now)
+            )
+            self.conn.commit()
+            self._puts += 1
+            evict_now = self._puts % 1000 == 0
+        if evict_now:
+            self.evict()  # keep the size bound during long runs too
+
+    # wall time of a real decode (+ its sleep), successful or not - used to estimate what hits saved
+    def add_miss_time(self, seconds):
+        with self._lock:
+            self.miss_seconds += seconds
+
+    # drop expired rows, then the least recently used rows beyond max_entries
+    def evict(self):
+        with self._lock:
+            self.conn.execute('DELETE FROM decoded_urls WHERE created_at < ?', (time.time() - self.ttl_seconds,))
+            count = self.conn.execute('SELECT COUNT(*) FROM decoded_urls').fetchone()[0]
+            if count > self.max_entries:
+                self.conn.execute(
+                    'DELETE FROM decoded_urls WHERE encoded_url IN ('
+                    'SELECT encoded_url FROM decoded_urls ORDER BY last_used ASC LIMIT ?)',
+                    (count - self.max_entries,)
+                )
+            self.conn.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        avg_miss = self.miss_seconds / self.misses if self.misses else 0.0
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'miss_seconds': round(self.miss_seconds, 2),
+            'est_seconds_saved': round(self.hits * avg_miss, 2),  # each hit skipped a decode + sleep
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"Decode cache: {stats['hits']} hits, {stats['misses']} misses (hit rate {stats['hit_rate']:.0%}), "
+              f"~{stats['est_seconds_saved']:.0f}s saved vs {stats['miss_seconds']:.0f}s spent decoding")
+
+_decode_cache = None
+_decode_cache_lock = threading.Lock()
+
+# shared per-process decode cache, opened on first use
+def get_decode_cache():
+    global _decode_cache
+    with _decode_cache_lock:
+        if _decode_cache is None:
+            _decode_cache = DecodeCache()
+        return _decode_cache
+
+# SEEN RSS ITEMS
+# per search term, the rss items whose outcome is settled (saved, filtered or already stored) - identified by
+# guid and by a title+source fingerprint, since google sometimes re-issues an item under a new guid
+# the when:Nd window means most of a term's items come back every day; seen ones are dropped right after
+# the rss parse. rows expire after ttl_days (the search window), so the store stays about one window big
+SEEN_ITEM_STORE = os.getenv('SEEN_ITEM_STORE', '1') != '0'
+
+class SeenItemStore:
+    def __init__(self, ttl_days, file_name='seen_items.sqlite'):
+        self.ttl_seconds = ttl_days * 24 * 3600
+        self._lock = threading.Lock()
+        self._pending = {}  # (term, item key) -> seen at, written by flush()
+        self.conn = open_cache_db(file_name)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS seen_items ('
+            'term TEXT NOT NULL, item_key TEXT NOT NULL, seen_at REAL NOT NULL, '
+            'PRIMARY KEY (term, item_key)) WITHOUT ROWID'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_seen_items_seen_at ON seen_items (seen_at)')
+        self.conn.commit()
+        self.terms_loaded = 0
+        self.marked = 0
+        self.evict()
+
+    # every live item key seen for a term
+    def seen_for(self, term):
+        with self._lock:
+            rows = self.conn.execute('SELECT item_key FROM seen_items WHERE term = ? AND seen_at >= ?',
+                                     (term, time.time() - self.ttl_seconds)).fetchall()
+            self.terms_loaded += 1
+        return {row[0] for row in rows}
+
+    def mark(self, term, item_keys):
+        now = time.time()
+        with self._lock:
+            for item_key in item_keys:
+                if (term, item_key) not in self._pending:
+                    self._pending[(term, item_key)] = now
+                    self.marked += 1
+
+    # one write per run, made by risk_engine.main() once the outputs are saved - a failed run forgets its marks
+    def flush(self):
+        with self._lock:
+            rows = [(term, item_key, seen_at) for (term, item_key), seen_at in self._pending.items()]
+            self._pending.clear()
+            self.conn.executemany('INSERT OR REPLACE INTO seen_items (term, item_key, seen_at) VALUES (?, ?, ?)', rows)
+            self.conn.commit()
+
+    def evict(self):
+        with self._lock:
+            self.conn.execute('DELETE FROM seen_items WHERE seen_at < ?', (time.time() - self.ttl_seconds,))
+            self.conn.commit()
+
+    def stats(self):
+        with self._lock:
+            stored = self.conn.execute('SELECT COUNT(*) FROM seen_items').fetchone()[0]
+        return {'terms_loaded': self.terms_loaded, 'marked': self.marked, 'stored': stored,
+                'ttl_days': round(self.ttl_seconds / 86400, 1)}
+
+_seen_store = None
+
+# shared per-process seen item store, or None when SEEN_ITEM_STORE=0
+def get_seen_store(ttl_days):
+    global _seen_store
+    if not SEEN_ITEM_STORE:
+        return None
+    with _decode_cache_lock:
+        if _seen_store is None:
+            _seen_store = SeenItemStore(ttl_days)
+        return _seen_store
+
+# RSS VALIDATOR CACHE
+# rss search url -> ETag / Last-Modified and the items parsed from that response, for conditional GETs:
+# a 304 costs google no body and us no parse, and the stored items stand in for the page
+# (see ScraperSession.fetch_rss_items); rows expire after RSS_CACHE_TTL_DAYS
+class RssFeedCache:
+    def __init__(self, file_name='rss_feeds.sqlite', ttl_days=RSS_CACHE_TTL_DAYS, max_entries=RSS_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_days * 24 * 3600
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.conn = open_cache_db(file_name)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS rss_feeds ('
+            'url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, items TEXT NOT NULL, stored_at REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_rss_feeds_stored_at ON rss_feeds (stored_at)')
+        self.conn.commit()
+        self.requests = 0  # rss requests made through the cache
+        self.conditional = 0  # ... of which carried a validator
+        self.not_modified = 0  # ... and came back 304
+        self.stored = 0
+        self.no_validators = 0  # 200s without ETag or Last-Modified - nothing to revalidate next time
+        self.evict()
+
+    # {'etag', 'last_modified', 'items'} for a url, or None
+    def get(self, url):
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT etag, last_modified, items, stored_at FROM rss_feeds WHERE url = ?', (url,)
+            ).fetchone()
+        if row is None or time.time() - row[3] > self.ttl_seconds:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'items': json.loads(row[2])}
+
+    def put(self, url, etag, last_modified, items):
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO rss_feeds (url, etag, last_modified, items, stored_at) VALUES (?, ?, ?, ?, ?)',
+                (url, etag, last_modified, json.dumps(items), time.time())
+            )
+            self.conn.commit()
+            self.stored += 1
+
+    # a 304 confirms the stored items are current - restart their ttl
+    def touch(self, url):
+        with self._lock:
+            self.conn.execute('UPDATE rss_feeds SET stored_at = ? WHERE url = ?', (time.time(), url))
+            self.conn.commit()
+
+    def count(self, conditional, not_modified=False, no_validators=False):
+        with self._lock:
+            self.requests += 1
+            self.conditional += conditional
+            self.not_modified += not_modified
+            self.no_validators += no_validators
+
+    def evict(self):
+        with self._lock:
+            self.conn.execute('DELETE FROM rss_feeds WHERE stored_at < ?', (time.time() - self.ttl_seconds,))
+            count = self.conn.execute('SELECT COUNT(*) FROM rss_feeds').fetchone()[0]
+            if count > self.max_entries:
+                self.conn.execute(
+                    'DELETE FROM rss_feeds WHERE url IN (SELECT url FROM rss_feeds ORDER BY stored_at ASC LIMIT ?)',
+                    (count - self.max_entries,)
+                )
+            self.conn.commit()
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'conditional': self.conditional,
+            'not_modified': self.not_modified,
+            'hit_rate': round(self.not_modified / self.requests, 4) if self.requests else 0.0,
+            'conditional_hit_rate': round(self.not_modified / self.conditional, 4) if self.conditional else 0.0,
+            'stored': self.stored,
+            'no_validators': self.no_validators,
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"RSS validator cache: {stats['not_modified']} of {stats['requests']} rss requests answered 304 "
+              f"(hit rate {stats['hit_rate']:.0%}, {stats['conditional_hit_rate']:.0%} of {stats['conditional']} conditional), "
+              f"{stats['no_validators']} responses without validators")
+
+_rss_cache = None
+
+# shared per-process rss validator cache, opened on first use
+def get_rss_cache():
+    global _rss_cache
+    with _decode_cache_lock:
+        if _rss_cache is None:
+            _rss_cache = RssFeedCache()
+        return _rss_cache
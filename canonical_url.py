@@ -0,0 +1,69 @@
+# CANONICAL URLS
+# one dedup key for every variant of an article url - used by the in-run article registry, the per-term
+# dedup, the existing links index and the storage keys, so the same story isn't downloaded or stored twice
+#   https://m.example.com/news/story/amp/?utm_source=x&fbclid=y  ->  https://example.com/news/story
+# the key is only ever compared, never fetched: scheme is folded to https and the whole key is lowercased
+# (as the old normalize_link did), so http/https and case variants also match
+
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+# query params that only track the click, never select the content
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'gclsrc', 'msclkid', 'yclid', 'twclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'ref', 'ref_src', 'ref_url', 'referrer', 'cmpid', 'ocid', 'ncid',
+    'smid', 'sr_share', 'taid', 'share', 'mod', 'rss', 'amp', 'outputtype',
+    'guccounter', 'guce_referrer', 'guce_referrer_sig', 'soc_src', 'soc_trk', 'rpc',
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'mtm_', 'at_', 'hsa_', 'oly_', 'vero_')
+HOST_PREFIXES = re.compile(r'^(www\d*|m|mobile|amp)\.')
+DEFAULT_PORTS = {':80', ':443'}
+
+def _is_tracking(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+# amp pages: /amp, /amp/ path segments, story.amp, story.amp.html
+def _strip_amp(path):
+    segments = [s for s in path.split('/') if s and s != 'amp']
+    if segments:
+        last = re.sub(r'\.amp(?=\.html?$)|\.amp$', '', segments[-1])
+        segments[-1] = last or segments[-1]
+    return '/' + '/'.join(segments) if segments else ''
+
+@lru_cache(maxsize=65536)
+def canonicalize_url(url):
+    if url is None:
+        return ''
+    url = str(url).strip()
+    parts = urlsplit(url)
+    if not parts.netloc:
+        return url.lower()  # not an absolute url - nothing to normalize but case, as before
+
+    host = parts.netloc.lower().rsplit('@', 1)[-1]
+    for port in DEFAULT_PORTS:
+        if host.endswith(port):
+            host = host[:-len(port)]
+    host = HOST_PREFIXES.sub('', host.rstrip('.'))
+
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)]
+    query = f"?{urlencode(sorted(query))}" if query else ''
+    return f"https://{host}{_strip_amp(parts.path)}{query}".lower()
+
+# registered domain of a url - "https://markets.ft.com/x" -> "ft.com", "https://news.bbc.co.uk/x" -> "bbc.co.uk"
+def registered_domain(url):
+    labels = urlsplit(url).netloc.lower().rsplit('@', 1)[-1].split(':', 1)[0].strip('.').split('.')
+    keep = 3 if len(labels) > 2 and len(labels[-1]) == 2 and len(labels[-2]) <= 3 else 2
+    return '.'.join(labels[-keep:])
+
+# the page's rel=canonical when it can stand in for the fetched url, else None - newspaper falls back to og:url,
+# which some sites point at their homepage, and syndicated copies name the original publisher's page, which
+# the blocklist and domain filters never saw and the row's source, paywall and credibility don't describe
+# so only an absolute url on the fetched url's registered domain, below the site root, is used
+def usable_canonical(url, canonical):
+    if not canonical or not canonical.startswith(('http://', 'https://')):
+        return None
+    if registered_domain(canonical) != registered_domain(url) or not urlsplit(canonical).path.strip('/'):
+        return None
+    return canonical
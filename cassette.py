@@ -0,0 +1,207 @@
+# record / replay of every network response a run sees, for reproducing slow or odd chunks offline
+# --record <file> captures rss, decoder and article responses into a gzip'd json-lines cassette
+# --replay <file> serves the run from that cassette with no network access (optionally with the original timings)
+# http goes through adapters mounted on the ScraperSession; the google decoder (which uses its own requests
+# calls) is captured at the decode_google_news_url wrapper
+# a request that raises (timeout, connection error, retries exhausted) is recorded as its exception type,
+# message and elapsed time, and replay raises the same exception after the same delay
+
+import base64
+import builtins
+import gzip
+import json
+import threading
+import time
+from pathlib import Path
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# headers that describe the wire format, not the body we keep (which requests has already decoded)
+DROP_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection')
+
+def _http_key(method, url):
+    return f"{method.upper()} {url}"
+
+# exception class for a recorded error - requests' own (ReadTimeout, RetryError, ...), else a builtin,
+# else a plain ConnectionError
+def _exception_class(name):
+    cls = getattr(requests.exceptions, name, None) or getattr(builtins, name, None)
+    return cls if isinstance(cls, type) and issubclass(cls, Exception) else requests.exceptions.ConnectionError
+
+class Cassette:
+    def __init__(self, path, mode, preserve_timing=False):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"unknown cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.preserve_timing = preserve_timing
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> recorded entries in the order they happened
+        self._served = {}  # key -> how many of them replay has used
+        self.meta = {}
+        self.recorded = 0
+        self.replayed = 0
+        self.missing = 0
+        if mode == 'record':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = gzip.open(self.path, 'wt', encoding='utf-8')
+        else:
+            self._file = None
+            self._load()
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    def _load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry['kind'] == 'meta':
+                    self.meta[entry['name']] = entry['value']
+                else:
+                    self._entries.setdefault(entry['key'], []).append(entry)
+        print(f"Replaying {sum(len(e) for e in self._entries.values())} recorded responses from {self.path}")
+
+    def _write(self, entry):
+        with self._lock:
+            self._file.write(json.dumps(entry) + '\n')
+            if entry['kind'] != 'meta':
+                self.recorded += 1
+
+    # next recorded entry for a key; repeats the last one if the replay asks more often than the recording did
+    def _next(self, key):
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.missing += 1
+                return None
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+            self.replayed += 1
+            return entries[min(index, len(entries) - 1)]
+
+    def _wait(self, entry):
+        if self.preserve_timing and entry.get('elapsed'):
+            time.sleep(entry['elapsed'])
+
+    # run-level state the replay needs to take the same path (e.g. the existing links snapshot)
+    def put_meta(self, name, value):
+        if self.mode == 'record':
+            self._write({'kind': 'meta', 'name': name, 'value': value})
+        else:
+            self.meta[name] = value
+
+    def record_response(self, request, response, elapsed):
+        self._write({
+            'kind': 'http',
+            'key': _http_key(request.method, request.url),
+            'status': response.status_code,
+            'reason': response.reason,
+            'url': response.url,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() not in DROP_HEADERS},
+            'body': base64.b64encode(response.content).decode('ascii'),
+            'elapsed': elapsed,
+        })
+
+    def record_error(self, key, error, elapsed):
+        self._write({'kind': 'error', 'key': key, 'error': type(error).__name__, 'message': str(error), 'elapsed': elapsed})
+
+    def _raise_recorded(self, entry, request=None):
+        cls = _exception_class(entry['error'])
+        if issubclass(cls, requests.exceptions.RequestException):
+            raise cls(entry['message'], request=request)
+        raise cls(entry['message'])
+
+    def replay_response(self, request):
+        entry = self._next(_http_key(request.method, request.url))
+        if entry is None:
+            raise requests.exceptions.ConnectionError(f"not in cassette: {request.method} {request.url}", request=request)
+        self._wait(entry)
+        if entry['kind'] == 'error':
+            self._raise_recorded(entry, request)
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry['reason']
+        response.url = entry['url']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = base64.b64decode(entry['body'])
+        response.request = request
+        return response
+
+    # wraps one google decoder call; `decoder` is the real function, only called when recording
+    def decode(self, encoded_url, decoder):
+        key = f"DECODE {encoded_url}"
+        if self.mode == 'record':
+            start = time.perf_counter()
+            try:
+                result = decoder(encoded_url)
+            except Exception as e:
+                self.record_error(key, e, time.perf_counter() - start)
+                raise
+            self.record_decode(encoded_url, result, time.perf_counter() - start)
+            return result
+        entry = self._next(key)
+        if entry is None:
+            return {'status': False, 'message': f"not in cassette: {encoded_url}"}
+        self._wait(entry)
+        if entry['kind'] == 'error':
+            self._raise_recorded(entry)
+        return entry['result']
+
+    def record_decode(self, encoded_url, result, elapsed):
+        if self.mode == 'record':
+            self._write({'kind': 'decode', 'key': f"DECODE {encoded_url}", 'result': result, 'elapsed': elapsed})
+
+    # swap every adapter mounted on a requests session for one that records through it or replays instead
+    def install(self, session):
+        for prefix, adapter in list(session.adapters.items()):
+            session.mount(prefix, CassetteAdapter(self, adapter))
+
+    def close(self):
+        if self._file:
+            with self._lock:
+                self._file.close()
+                self._file = None
+
+    def stats(self):
+        return {'mode': self.mode, 'path': str(self.path), 'recorded': self.recorded,
+                'replayed': self.replayed, 'missing': self.missing}
+
+    def print_stats(self):
+        if self.mode == 'record':
+            print(f"Cassette: recorded {self.recorded} responses to {self.path}")
+        else:
+            print(f"Cassette: replayed {self.replayed} responses from {self.path} ({self.missing} not in cassette)")
+
+class CassetteAdapter(BaseAdapter):
+    def __init__(self, cassette, inner):
+        super().__init__()
+        self.cassette = cassette
+        self.inner = inner  # the real adapter (pooling, retries) - unused when replaying
+
+    def send(self, request, **kwargs):
+        if self.cassette.replaying:
+            return self.cassette.replay_response(request)
+        start = time.perf_counter()  # response.elapsed is only set once the adapter has returned
+        try:
+            response = self.inner.send(request, **kwargs)
+        except Exception as e:
+            self.cassette.record_error(_http_key(request.method, request.url), e, time.perf_counter() - start)
+            raise
+        self.cassette.record_response(request, response, time.perf_counter() - start)
+        return response
+
+    def close(self):
+        self.inner.close()
+
+# set by the risk scripts' --record / --replay options; None for normal runs
+active_cassette = None
+
+def activate(path, mode, preserve_timing=False):
+    global active_cassette
+    active_cassette = Cassette(path, mode, preserve_timing)
+    return active_cassette
@@ -1,21 +1,15 @@
 import pandas as pd
 import os
 from urllib.parse import urlparse
+from source_registry import SourceRegistry
 
 # set the base directory
 base_dir = r'C:\Users\giova\Documents\GitHub\daily_sentiment_feed'
 data_dir = os.path.join(base_dir, 'data')
 output_dir = os.path.join(base_dir, 'output')
 
-# load the source_and_type.csv to get paywalled and credibility info
-source_file = os.path.join(data_dir, 'source_and_type.csv')
-source_df = pd.read_csv(source_file)
-
-# create mappings: lowercase for matching since sources might vary in case
-paywalled_set = set(source_df[source_df['IS_PAYWALLED'] == 1]['SOURCE_NAME'].str.lower().str.strip())
-credibility_map = dict(zip(source_df['SOURCE_NAME'].str.lower().str.strip(), source_df['CREDIBILITY_TYPE']))
-
-print(f"loaded {len(paywalled_set)} paywalled sources and {len(credibility_map)} credibility mappings")
+# load the shared source registry to get paywalled and credibility info (same lookups as the scrapers)
+sources = SourceRegistry(data_dir)
 
 # extract domain name from url - simplified to full domain
 def get_source_name(url):
@@ -42,18 +36,18 @@ def clean_csv(file_name):
     # compute domain from source_url for accurate matching
     df['DOMAIN'] = df['SOURCE_URL'].apply(get_source_name).str.strip()
     
-    # update PAYWALLED: convert to bool, True if in paywalled_set
+    # update PAYWALLED: convert to bool, True if the registry lists the domain as paywalled
     if 'PAYWALLED' in df.columns:
-        df['PAYWALLED'] = df['DOMAIN'].isin(paywalled_set)
+        df['PAYWALLED'] = df['DOMAIN'].map(sources.is_paywalled)
     else:
-        df['PAYWALLED'] = df['DOMAIN'].isin(paywalled_set)
+        df['PAYWALLED'] = df['DOMAIN'].map(sources.is_paywalled)
         print(f"added missing PAYWALLED column to {file_name}")
     
-    # update CREDIBILITY_TYPE: map from dict, default to 'Relevant Article' if no match
+    # update CREDIBILITY_TYPE: registry lookup, default to 'Relevant Article' if no match
     if 'CREDIBILITY_TYPE' in df.columns:
-        df['CREDIBILITY_TYPE'] = df['DOMAIN'].map(credibility_map).fillna('Relevant Article')
+        df['CREDIBILITY_TYPE'] = df['DOMAIN'].map(sources.credibility_type)
     else:
-        df['CREDIBILITY_TYPE'] = df['DOMAIN'].map(credibility_map).fillna('Relevant Article')
+        df['CREDIBILITY_TYPE'] = df['DOMAIN'].map(sources.credibility_type)
         print(f"added missing CREDIBILITY_TYPE column to {file_name}")
     
     # remove rows with null published_date
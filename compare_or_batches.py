@@ -0,0 +1,103 @@
+# OR BATCH RECALL
+# for each OR_BATCH_TERMS size, how many of the rss items a term's own query returns come back - attributed
+# to that term - from the OR-batched queries query_planner.py would send, and how many google requests it takes
+# rss only (no decode or download), so a cassette of a few hundred feeds is enough to pick a batch size
+# python compare_or_batches.py --lists enterprise --batch-sizes 2 4 8 --record fixtures/or_batches.jsonl.gz
+# python compare_or_batches.py --lists enterprise --batch-sizes 2 4 8 --replay fixtures/or_batches.jsonl.gz
+
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+import cassette
+import risk_engine
+from query_planner import plan_queries, batch_queries, OR_BATCH_MAX_QUERY
+from utils import ScraperSession, fetch_google_news_rss_pages, search_term_matches, RSS_PAGES, TERM_WORKERS
+
+# every item of a query's feed pages -> (item keys, rss requests made)
+def fetch_feed(query, session, pages):
+    keys = {}
+    requests_made = 0
+    feed = fetch_google_news_rss_pages(query, session, risk_engine.SEARCH_DAYS, pages=pages)
+    try:
+        for _, _, items in feed:
+            requests_made += 1
+            for item in items:
+                if item['title'] and item['link']:
+                    keys.setdefault(item['guid'] or item['link'], item['title'])
+    except requests.exceptions.RequestException as e:
+        print(f"SPOTTED REQUEST ERROR - query {query[:50]}...: {e}")
+    finally:
+        feed.close()
+    return keys, requests_made
+
+# per-plan item keys for one list of plans; a batch's items are split across its members by title match
+def attributed_items(plans, session, pages):
+    with ThreadPoolExecutor(max(TERM_WORKERS, 1)) as pool:
+        feeds = list(pool.map(lambda plan: fetch_feed(plan.query, session, pages), plans))
+    found = {}
+    for plan, (keys, _) in zip(plans, feeds):
+        for member in plan.members:
+            found[member.key] = {key for key, title in keys.items()
+                                 if not plan.batched or search_term_matches(member.query, title.lower())}
+    return found, sum(requests_made for _, requests_made in feeds)
+
+def compare(baseline, found):
+    relevant = sum(len(keys) for keys in baseline.values())
+    kept = sum(len(keys & found.get(term, set())) for term, keys in baseline.items())
+    term_recalls = [len(keys & found.get(term, set())) / len(keys) for term, keys in baseline.items() if keys]
+    return {
+        'recall': round(kept / relevant, 3) if relevant else 1.0,
+        'mean_term_recall': round(sum(term_recalls) / len(term_recalls), 3) if term_recalls else 1.0,
+        'terms_with_zero_recall': sum(1 for recall in term_recalls if recall == 0),
+        'extra_items': sum(len(found.get(term, set()) - keys) for term, keys in baseline.items()),
+    }
+
+def main():
+    arg_parser = risk_engine.build_arg_parser()
+    arg_parser.description = 'Recall of OR-batched google news queries against per-term queries'
+    arg_parser.add_argument('--batch-sizes', type=int, nargs='+', default=[2, 4, 8])
+    arg_parser.add_argument('--max-query', type=int, default=OR_BATCH_MAX_QUERY, help='url-encoded query length budget')
+    arg_parser.add_argument('--pages', type=int, default=RSS_PAGES, help='rss pages per query')
+    arg_parser.add_argument('--json', help='write the results to this file')
+    args = arg_parser.parse_args()
+
+    if args.record:
+        tape = cassette.activate(args.record, 'record')
+    elif args.replay:
+        tape = cassette.activate(args.replay, 'replay')
+    else:
+        tape = None
+    session = ScraperSession()
+    try:
+        runs = [(risk_engine.RISK_LISTS[name], risk_engine.load_search_terms(risk_engine.RISK_LISTS[name], args.chunk_start,
+                                                                            args.chunk_end), None) for name in args.lists]
+        plans, _ = plan_queries(runs, or_batch_terms=1)
+        baseline, baseline_requests = attributed_items(plans, session, args.pages)
+        results = [{'batch_terms': 1, 'queries': len(plans), 'rss_requests': baseline_requests, **compare(baseline, baseline)}]
+        for size in args.batch_sizes:
+            batched, _ = batch_queries(plans, size, args.max_query)
+            found, rss_requests = attributed_items(batched, session, args.pages)
+            results.append({'batch_terms': size, 'queries': len(batched), 'rss_requests': rss_requests, **compare(baseline, found)})
+    finally:
+        session.close()
+        if tape:
+            tape.print_stats()
+            tape.close()
+
+    print(f"OR batch recall against per-term queries ({len(plans)} queries, {args.pages} pages each, "
+          f"budget {args.max_query} encoded chars):")
+    for result in results:
+        print(f"  {result['batch_terms']:>3} terms/query: {result['queries']:>4} queries, {result['rss_requests']:>4} rss requests, "
+              f"recall {result['recall']:.1%} (mean per term {result['mean_term_recall']:.1%}, "
+              f"{result['terms_with_zero_recall']} terms at 0%), {result['extra_items']} items only the batch found")
+    if tape and tape.missing:
+        print(f"Warning: {tape.missing} requests were not in the cassette - record it with the same --batch-sizes")
+    sys.stdout.flush()
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+# ASYNC FETCH ENGINE
+# publisher downloads on one asyncio loop (its own thread) instead of one blocking thread per download,
+# so a chunk can keep FETCH_MAX_IN_FLIGHT downloads going while each host still gets at most
+# MAX_CONNECTIONS_PER_HOST; one aiohttp session keeps connections (and TLS sessions) alive across articles
+# FETCH_ENGINE=thread keeps the requests/thread-pool path; it is also used when aiohttp isn't installed and
+# for --record / --replay runs, since cassettes capture the requests session
+# rss fetches stay on the requests session - they are paced by the google rate limiter, not by concurrency
+
+import asyncio
+import os
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+FETCH_ENGINE = os.getenv('FETCH_ENGINE', 'async').lower()  # 'async' or 'thread'
+FETCH_MAX_IN_FLIGHT = int(os.getenv('FETCH_MAX_IN_FLIGHT', '64'))  # publisher downloads in flight, all hosts
+FETCH_RETRIES = int(os.getenv('FETCH_RETRIES', '3'))
+FETCH_BACKOFF = float(os.getenv('FETCH_BACKOFF', '1'))
+RETRY_STATUSES = (429, 500, 502, 503, 504)  # same as the requests session's Retry
+
+class AsyncFetchEngine:
+    def __init__(self, max_in_flight=FETCH_MAX_IN_FLIGHT, per_host=2, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF):
+        self.max_in_flight = max(max_in_flight, 1)
+        self.per_host = max(per_host, 1)
+        self.retries = retries
+        self.backoff = backoff
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='fetch-engine', daemon=True)
+        self._thread.start()
+        self._session = None
+        self._in_flight = None
+        self._host_slots = {}
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+        self.bytes = 0
+        self.peak_in_flight = 0
+        self._active = 0
+
+    # runs on the loop thread - aiohttp objects must be created inside the loop that uses them
+    def _ensure_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight, limit_per_host=self.per_host, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, trust_env=True)  # honours HTTP(S)_PROXY like requests
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        return self._session
+
+    def _host_slot(self, host):
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return slot
+
+    # schedule a coroutine on the engine loop from any thread; returns a concurrent.futures.Future
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    # GET a url and return a requests.Response built from the body, so callers decode it exactly like the
+    # thread path (html_from_response); retries the same statuses and connection errors with backoff
+    async def get(self, url, headers=None, timeout=20):
+        session = self._ensure_session()
+        host = urlparse(url).netloc.lower()
+        async with self._in_flight, self._host_slot(host):
+            self._active += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._active)
+            try:
+                for attempt in range(self.retries + 1):
+                    if attempt:
+                        self.retried += 1
+                        await asyncio.sleep(self.backoff * 2 ** (attempt - 1) if attempt > 1 else 0)  # 0, 2, 4s like urllib3
+                    self.requests += 1
+                    try:
+                        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout),
+                                               allow_redirects=True) as response:
+                            body = await response.read()
+                            if response.status in RETRY_STATUSES and attempt < self.retries:
+                                continue
+                            self.bytes += len(body)
+                            return _to_requests_response(response, body)
+                    except (aiohttp.ClientError, asyncio.TimeoutError):
+                        if attempt == self.retries:
+                            self.failures += 1
+                            raise
+            finally:
+                self._active -= 1
+
+    async def _close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    def close(self):
+        if self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._close(), self._loop).result(timeout=10)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+
+    def stats(self):
+        return {'engine': 'async', 'max_in_flight': self.max_in_flight, 'per_host': self.per_host,
+                'requests': self.requests, 'retried': self.retried, 'failures': self.failures,
+                'bytes': self.bytes, 'peak_in_flight': self.peak_in_flight, 'hosts': len(self._host_slots)}
+
+    def print_stats(self):
+        print(f"Fetch engine: async, {self.requests} requests ({self.retried} retries, {self.failures} failed), "
+              f"peak {self.peak_in_flight}/{self.max_in_flight} in flight across {len(self._host_slots)} hosts")
+
+def _to_requests_response(response, body):
+    result = requests.Response()
+    result.status_code = response.status
+    result.reason = response.reason
+    result.url = str(response.url)
+    result.headers = CaseInsensitiveDict(response.headers)
+    result.encoding = get_encoding_from_headers(result.headers)
+    result._content = body
+    return result
+
+# the engine a ScraperSession should use for downloads, or None for the thread path
+def create_fetch_engine(per_host, cassette_active=False):
+    if FETCH_ENGINE != 'async':
+        return None
+    if aiohttp is None:
+        print("Warning: aiohttp not installed - FETCH_ENGINE=async falls back to the thread path")
+        return None
+    if cassette_active:
+        print("Fetch engine: thread path while recording/replaying (cassettes capture the requests session)")
+        return None
+    return AsyncFetchEngine(per_host=per_host)
@@ -0,0 +1,227 @@
+# streaming stage pipeline used by the enterprise and emerging risks scripts
+# each stage has its own worker threads and a bounded input queue, so a slow stage (e.g. decoding)
+# back-pressures the stages before it instead of piling up work in memory, while later stages keep
+# draining whatever is already in their queue
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '100'))  # max items waiting in front of each stage
+PIPELINE_REPORT_SECONDS = float(os.getenv('PIPELINE_REPORT_SECONDS', '30'))  # progress print interval, 0 = off
+
+_DONE = object()  # sentinel - one per worker tells it the upstream stage has finished
+
+# fn takes one item and returns a list of output items (empty list = drop, several = fan-out)
+# with batch_size > 1, fn takes a list of up to batch_size items instead; batch_wait is how long a
+# worker waits for a batch to fill before running with what it has
+# with max_pending set, fn may also return a concurrent.futures.Future of the output list (e.g. an async
+# download) - the worker moves on to its next item and up to max_pending futures are outstanding at once
+class Stage:
+    def __init__(self, name, fn, workers=1, queue_size=PIPELINE_QUEUE_SIZE, batch_size=1, batch_wait=0.5,
+                 max_pending=None):
+        self.name = name
+        self.fn = fn
+        self.workers = max(workers, 1)
+        self.batch_size = max(batch_size, 1)
+        self.batch_wait = batch_wait
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._running = self.workers
+        self.max_pending = max_pending
+        self._pending_slots = threading.BoundedSemaphore(max_pending) if max_pending else None
+        self._completed = queue.SimpleQueue()  # finished futures, drained by the stage's collector thread
+        self._pending = 0
+        self.max_in_flight = 0
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def put(self, item):
+        self.queue.put(item)
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def _next_batch(self):
+        first = self.queue.get()
+        if first is _DONE or self.batch_size == 1:
+            return first, []
+        batch = [first]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            try:
+                item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, [_DONE]  # run what we have, then stop
+            batch.append(item)
+        return batch, []
+
+    def stats(self):
+        elapsed = ((self.finished_at or time.monotonic()) - self.started_at) if self.started_at else 0.0
+        return {
+            'workers': self.workers,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'errors': self.errors,
+            'queue_depth': self.queue.qsize(),
+            'max_queue_depth': self.max_depth,
+            'busy_seconds': round(self.busy_seconds, 2),
+            'max_in_flight': self.max_in_flight,
+            'items_per_sec': round(self.items_in / elapsed, 2) if elapsed else 0.0,
+        }
+
+class Pipeline:
+    def __init__(self, stages, sink=None):
+        self.stages = stages
+        self.sink = sink  # called with each item leaving the last stage; default collects them
+        self.results = []
+        self._sink_lock = threading.Lock()
+
+    def _emit(self, index, outputs):
+        if index + 1 < len(self.stages):
+            next_stage = self.stages[index + 1]
+            for output in outputs:
+                next_stage.put(output)
+            return
+        with self._sink_lock:
+            for output in outputs:
+                if self.sink:
+                    self.sink(output)
+                else:
+                    self.results.append(output)
+
+    def _finish_stage(self, index):
+        stage = self.stages[index]
+        stage.finished_at = time.monotonic()
+        if index + 1 < len(self.stages):
+            next_stage = self.stages[index + 1]
+            for _ in range(next_stage.workers):
+                next_stage.queue.put(_DONE)
+
+    def _stage_error(self, stage, count, e):
+        with stage._lock:
+            stage.errors += count
+        print(f"  ---pipeline stage '{stage.name}' error: {e}")
+
+    def _worker(self, index):
+        stage = self.stages[index]
+        pending_done = False
+        while not pending_done:
+            work, extra = stage._next_batch()
+            if work is _DONE:
+                break
+            pending_done = bool(extra)
+            count = len(work) if stage.batch_size > 1 else 1
+            if stage._pending_slots:
+                stage._pending_slots.acquire()  # back-pressure: blocks while max_pending futures are outstanding
+            busy_start = time.perf_counter()
+            try:
+                outputs = stage.fn(work) or []
+            except Exception as e:
+                outputs = []
+                self._stage_error(stage, count, e)
+            with stage._lock:
+                stage.items_in += count
+                stage.busy_seconds += time.perf_counter() - busy_start
+            if isinstance(outputs, Future):
+                with stage._lock:
+                    stage._pending += 1
+                    stage.max_in_flight = max(stage.max_in_flight, stage._pending)
+                # the callback runs on whichever thread completes the future - it only queues, never blocks
+                outputs.add_done_callback(lambda future: stage._completed.put((future, count)))
+                continue
+            if stage._pending_slots:
+                stage._pending_slots.release()
+            with stage._lock:
+                stage.items_out += len(outputs)
+            self._emit(index, outputs)
+
+        # last worker out tells every worker of the next stage that no more input is coming
+        # (or, with futures outstanding, tells the collector to do so once they have all landed)
+        with stage._lock:
+            stage._running -= 1
+            last = stage._running == 0
+        if last and stage.max_pending:
+            stage._completed.put(_DONE)
+        elif last:
+            self._finish_stage(index)
+
+    # emits the results of a max_pending stage's futures as they complete
+    def _collector(self, index):
+        stage = self.stages[index]
+        workers_done = False
+        while True:
+            with stage._lock:
+                if workers_done and stage._pending == 0:
+                    break
+            entry = stage._completed.get()
+            if entry is _DONE:
+                workers_done = True
+                continue
+            future, count = entry
+            try:
+                outputs = future.result() or []
+            except Exception as e:
+                outputs = []
+                self._stage_error(stage, count, e)
+            with stage._lock:
+                stage.items_out += len(outputs)
+            self._emit(index, outputs)  # may block on the next stage's queue - only this thread waits
+            with stage._lock:
+                stage._pending -= 1
+            stage._pending_slots.release()
+        self._finish_stage(index)
+
+    def _report(self, stop):
+        while not stop.wait(PIPELINE_REPORT_SECONDS):
+            self.print_stats(prefix="  pipeline progress")
+
+    # feeds `items` into the first stage and blocks until every stage has drained
+    def run(self, items):
+        now = time.monotonic()
+        threads = []
+        for index, stage in enumerate(self.stages):
+            stage.started_at = now
+            for n in range(stage.workers):
+                thread = threading.Thread(target=self._worker, args=(index,), name=f"{stage.name}-{n}", daemon=True)
+                thread.start()
+                threads.append(thread)
+            if stage.max_pending:
+                thread = threading.Thread(target=self._collector, args=(index,), name=f"{stage.name}-collector", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        stop_report = threading.Event()
+        if PIPELINE_REPORT_SECONDS > 0:
+            threading.Thread(target=self._report, args=(stop_report,), daemon=True).start()
+
+        first = self.stages[0]
+        for item in items:
+            first.put(item)  # blocks while the first stage is saturated, so the feed stays bounded too
+        for _ in range(first.workers):
+            first.queue.put(_DONE)
+
+        for thread in threads:
+            thread.join()
+        stop_report.set()
+        return self.results
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def print_stats(self, prefix="Pipeline"):
+        print(f"{prefix}:")
+        for name, stats in self.stats().items():
+            print(f"    {name:<10} workers={stats['workers']:<3} in={stats['items_in']:<5} out={stats['items_out']:<5} "
+                  f"errors={stats['errors']:<3} queue={stats['queue_depth']}/max {stats['max_queue_depth']:<4} "
+                  f"busy={stats['busy_seconds']:.1f}s rate={stats['items_per_sec']:.2f}/s"
+                  + (f" in flight max={stats['max_in_flight']}" if stats['max_in_flight'] else ""))
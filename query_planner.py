@@ -0,0 +1,97 @@
+# QUERY PLANNER
+# risk lists (and risks within a list) often decode to the same google news query - plan_queries groups
+# every loaded search term by its normalized query, so each query is fetched and decoded once and its
+# results are attributed back to every (risk list, RISK_ID, SEARCH_TERM_ID) that asked for it
+# the query sent is the first requester's own text, so an un-shared term requests exactly what it did before
+# OR_BATCH_TERMS > 1 (off by default) also packs short plain queries into one google `OR` query under a
+# url-length budget; a batched item only goes to the member terms its title matches (utils.search_term_matches,
+# the quality score's relevance test), so recall drops when google matches on text the title doesn't show -
+# compare_or_batches.py measures that against per-term queries on a recorded cassette
+
+import os
+import re
+from urllib.parse import quote
+
+OR_BATCH_TERMS = int(os.getenv('OR_BATCH_TERMS', '1'))  # search terms per google query; 1 = one query per term
+OR_BATCH_MAX_QUERY = int(os.getenv('OR_BATCH_MAX_QUERY', '256'))  # longest url-encoded q= text for a batch
+
+QUOTES = str.maketrans({'\u201c': '"', '\u201d': '"', '\u2018': "'", '\u2019': "'"})  # curly -> straight
+OPERATORS = re.compile(r'["()]|\b(OR|AND)\b|\w:|(^|\s)-')  # terms using search syntax keep their own query
+
+# google matching is case-insensitive and ignores extra whitespace - operators and quotes are kept as-is
+def normalize_query(term):
+    if not isinstance(term, str):
+        return ''
+    return re.sub(r'\s+', ' ', term.translate(QUOTES)).strip().lower()
+
+class QueryPlan:
+    def __init__(self, query, key):
+        self.query = query  # text sent to google
+        self.key = key  # normalized form shared by every requester
+        self.requesters = []  # (risk_list, search term row)
+        self.members = [self]  # the plans an OR batch stands for
+
+    @property
+    def batched(self):
+        return len(self.members) > 1
+
+def or_query(plans):
+    return ' OR '.join(f"({plan.query.strip()})" for plan in plans)
+
+# packs consecutive plain queries into OR batches of up to max_terms, keeping each batch's encoded query
+# within max_chars; returns the new plan list (single plans untouched) and the number of batches
+def batch_queries(plans, max_terms=OR_BATCH_TERMS, max_chars=OR_BATCH_MAX_QUERY):
+    if max_terms <= 1:
+        return plans, 0
+    batched = []
+    current = []
+    batches = 0
+
+    def flush():
+        nonlocal batches
+        if len(current) == 1:
+            batched.append(current[0])
+        elif current:
+            plan = QueryPlan(or_query(current), ' OR '.join(member.key for member in current))
+            plan.members = list(current)
+            plan.requesters = [requester for member in current for requester in member.requesters]
+            batched.append(plan)
+            batches += 1
+        current.clear()
+
+    for plan in plans:
+        if OPERATORS.search(plan.query) or len(quote(plan.query)) > max_chars:
+            batched.append(plan)
+            continue
+        if current and (len(current) >= max_terms or len(quote(or_query(current + [plan]))) > max_chars):
+            flush()
+        current.append(plan)
+    flush()
+    return batched, batches
+
+# runs: [(risk_list, search_terms_df, existing_links)] -> plans in first-seen order, plus planning stats
+def plan_queries(runs, or_batch_terms=OR_BATCH_TERMS, or_batch_max_query=OR_BATCH_MAX_QUERY):
+    plans = {}
+    terms = 0
+    for risk_list, search_terms_df, _ in runs:
+        for _, row in search_terms_df.iterrows():
+            key = normalize_query(row['SEARCH_TERMS'])
+            if not key:
+                print(f"  ---skipping invalid search term for risk ID {row[risk_list.risk_id_col]}")
+                continue
+            terms += 1
+            plan = plans.get(key)
+            if plan is None:
+                plan = plans[key] = QueryPlan(row['SEARCH_TERMS'], key)
+            plan.requesters.append((risk_list, row))
+    plans = list(plans.values())
+    stats = {'terms': terms, 'unique_queries': len(plans), 'coalesced_terms': terms - len(plans),
+             'shared_queries': sum(1 for plan in plans if len(plan.requesters) > 1)}
+
+    plans, batches = batch_queries(plans, or_batch_terms, or_batch_max_query)
+    stats.update(queries=len(plans), or_batch_terms=or_batch_terms, or_batches=batches,
+                 or_batched_queries=sum(len(plan.members) for plan in plans if plan.batched))
+    print(f"Query planner: {terms} search terms -> {len(plans)} google queries "
+          f"({stats['coalesced_terms']} terms share a query with another term"
+          + (f", {stats['or_batched_queries']} queries in {batches} OR batches of up to {or_batch_terms})" if batches else ")"))
+    return plans, stats
@@ -0,0 +1,862 @@
+# RISK ENGINE
+# the news sentiment scraper for every risk list - enterprise, emerging, and any list added to RISK_LISTS
+# one process runs any number of lists through one pipeline, sharing the http session, the google rate
+# limiter, the decode cache, the article registry and the nlp worker processes; each list keeps its own
+# search terms, existing links index, output csv and run report, exactly as when it runs alone
+#   python risk_engine.py --lists enterprise emerging --chunk-start 0 --chunk-end 5
+# EnterpriseRiskNews.py and EmergingRiskNews.py are thin wrappers that run a single list
+
+import datetime as dt
+import hashlib
+import random
+import re
+import requests
+from newspaper import Config
+import threading
+from urllib.parse import urlparse
+import pandas as pd
+import sys
+import argparse
+import os
+
+# GLOBAL CONSTANTS
+SEARCH_DAYS = 7  # look back this many days for news articles; edit to change
+
+# one risk list: where its search terms come from and where its results go
+class RiskList:
+    def __init__(self, name, risk_id_col, encoded_csv, output_csv, script):
+        self.name = name  # also the risk type in logs, storage and archive names
+        self.risk_id_col = risk_id_col  # makes sure it matches the CSV column
+        self.encoded_csv = encoded_csv
+        self.output_csv = output_csv
+        self.script = script
+
+RISK_LISTS = {
+    'enterprise': RiskList('enterprise', 'ENTERPRISE_RISK_ID', 'EnterpriseRisksListEncoded.csv',
+                           'enterprise_risks_online_sentiment.csv', 'EnterpriseRiskNews'),
+    'emerging': RiskList('emerging', 'EMERGING_RISK_ID', 'EmergingRisksListEncoded.csv',
+                         'emerging_risks_online_sentiment.csv', 'EmergingRiskNews'),
+}
+
+# decoding logic (retained from original script but made a fx)
+def process_encoded_search_terms(term):
+    try:
+        encoded_number = int(term)
+        byte_length = (encoded_number.bit_length() + 7) // 8
+        byte_rep = encoded_number.to_bytes(byte_length, byteorder='little')
+        decoded_text = byte_rep.decode('utf-8')
+        return decoded_text
+    except (ValueError, UnicodeDecodeError, OverflowError):
+        return None
+
+# IMPORTANT!! Import shared utilities from utils.py
+from utils import (
+    ScraperSession, setup_nltk, load_existing_links, setup_output_dir,
+    save_results, print_debug_info, DEBUG_MODE,
+    MAX_ARTICLES_PER_TERM, MAX_SEARCH_TERMS, load_source_lists, 
+    calculate_quality_score, get_source_name,
+    fetch_google_news_rss_pages, decode_google_news_url, peek_decoded_url, google_rate_limiter, article_registry, ExistingLinkIndex,
+    parse_rss_date, calculate_triage_score, search_term_matches,
+    TERM_WORKERS, DECODE_WORKERS, DOWNLOAD_WORKERS, PARSE_WORKERS, KEYBERT_BATCH_SIZE
+)
+from cache import get_decode_cache, get_seen_store
+from pipeline import Pipeline, Stage
+from run_report import run_stats, report_path_for
+from storage import RETENTION_DAYS
+from article_workers import get_article_workers
+from canonical_url import canonicalize_url, usable_canonical
+from query_planner import plan_queries, normalize_query
+import cassette
+
+def build_arg_parser(default_lists=None):
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--lists', nargs='+', choices=list(RISK_LISTS), default=default_lists or list(RISK_LISTS),
+                            help='risk lists to run in this process')
+    # CHUNKING 1 - setup argparse to chunk search terms (applied to each list)
+    arg_parser.add_argument('--chunk-start', type=int, default=0)
+    arg_parser.add_argument('--chunk-end', type=int, default=None)
+    # RECORD / REPLAY - capture every network response of a run, or re-run it offline from the capture
+    arg_parser.add_argument('--record', metavar='CASSETTE', help='record all rss, decoder and article responses to this file')
+    arg_parser.add_argument('--replay', metavar='CASSETTE', help='serve the run from a recorded cassette, no network')
+    arg_parser.add_argument('--replay-timing', action='store_true', help='with --replay, wait as long as the original responses took')
+    return arg_parser
+
+# output csv for one list - replays never touch the real output, chunks write their own file
+def output_csv_for(risk_list, tape, chunk_id):
+    output_csv = risk_list.output_csv
+    if tape and tape.replaying:
+        output_csv = output_csv.rsplit('.csv', 1)[0] + '_replay.csv'
+    # CHUNKING 2 - filename
+    if chunk_id is not None:
+        base_name = output_csv.rsplit('.csv', 1)[0]  # split before .csv
+        output_csv = f"{base_name}_chunk_{chunk_id}.csv"
+        print(f"DEBUG: chunked filename - {output_csv}")   # optional: to verify
+    return output_csv
+
+# this is the main fx that orchestrates the entire process.
+def main(default_lists=None):
+    args = build_arg_parser(default_lists).parse_args()
+    risk_lists = [RISK_LISTS[name] for name in dict.fromkeys(args.lists)]
+    script = risk_lists[0].script if len(risk_lists) == 1 else "risk_engine"
+    
+    # process time start for reference
+    print("*" * 50)
+    start_time = dt.datetime.now()
+    print_debug_info(script, "+".join(r.name for r in risk_lists), start_time)
+    
+    # RECORD / REPLAY - must be active before the session is created so its adapters get wrapped
+    tape = None
+    if args.record and args.replay:
+        print("ERROR!!! --record and --replay can't be combined")
+        sys.exit(1)
+    if args.record:
+        tape = cassette.activate(args.record, 'record')
+        print(f"Recording network responses to {args.record}")
+    elif args.replay:
+        tape = cassette.activate(args.replay, 'replay', preserve_timing=args.replay_timing)
+        google_rate_limiter.disable()
+    chunk_id = os.getenv('CHUNK_ID')
+    
+    # setup NLTK and session etc. - once for every list
+    setup_nltk()
+    session = ScraperSession()
+    
+    # load data - per list
+    runs = []
+    output_paths = {}
+    for risk_list in risk_lists:
+        output_path = setup_output_dir(output_csv_for(risk_list, tape, chunk_id))
+        output_paths[risk_list.name] = output_path
+        # cassettes recorded before multi-list runs hold a single 'existing_links' entry
+        meta_key = f"existing_links:{risk_list.name}"
+        if tape and tape.replaying:
+            pairs = tape.meta.get(meta_key, tape.meta.get('existing_links', []))
+            existing_links = ExistingLinkIndex.from_pairs(pairs)
+            print(f"Existing links index from cassette: {len(existing_links)} (risk, link) pairs")
+        else:
+            existing_links = load_existing_links(output_path)
+            if tape:
+                tape.put_meta(meta_key, existing_links.pairs())
+        search_terms_df = load_search_terms(risk_list, args.chunk_start, args.chunk_end)
+        
+        # only limit search terms in debug mode
+        if DEBUG_MODE and MAX_SEARCH_TERMS:
+            search_terms_df = search_terms_df.head(MAX_SEARCH_TERMS)
+            print(f"DEBUG: Limited to first {MAX_SEARCH_TERMS} search terms")
+        runs.append((risk_list, search_terms_df, existing_links))
+    
+    # load whitelist, paywalled, credibility and block/allow lists
+    sources = load_source_lists()
+    
+    # process articles
+    # a chunk csv is only merged into the committed main csv by the publish job, so its rows aren't settled
+    # here - the next run skips them as existing links once they are actually in the main csv
+    articles = process_risk_lists(runs, session, sources, settle_saved=chunk_id is None)
+    
+    # save results
+    record_counts = {}
+    for risk_list, _, _ in runs:
+        articles_df = articles[risk_list.name]
+        output_path = output_paths[risk_list.name]
+        print(f"Processed {risk_list.name} DF size: {len(articles_df)}") # debug print
+        record_counts[risk_list.name] = None
+        if not articles_df.empty:
+            # a replay gets its own archive partitions and key index too, never the production ones
+            storage_type = f"{risk_list.name}_replay" if tape and tape.replaying else risk_list.name
+            record_counts[risk_list.name] = save_results(articles_df, output_path, storage_type)
+            print(f"About to save to: {str(output_path)}") # debug print
+            print(f"Completed: {record_counts[risk_list.name]} total records") # validation print
+        else:
+            print(f"WARNING!!! No {risk_list.name} articles processed!!")
+    
+    # SEEN ITEMS - the run's settled items are only committed once every list's rows are saved; a failed
+    # save or a killed job leaves them unmarked, so the next run picks them up again
+    seen_store = seen_store_for(tape)
+    if seen_store:
+        seen_store.flush()
+        seen_stats = dict(seen_store.stats(), items_dropped=run_stats.counters.get('seen_before_rss', 0),
+                          terms_short_circuited=run_stats.counters.get('seen_term_short_circuit', 0))
+        run_stats.add_section('seen_items', seen_stats)
+        print(f"Seen items: dropped {seen_stats['items_dropped']} rss items settled in earlier runs, "
+              f"{seen_stats['terms_short_circuited']} unchanged queries stopped after one page, "
+              f"{seen_stats['marked']} items settled this run ({seen_stats['stored']} stored)")
+    
+    article_workers = get_article_workers()
+    article_workers.print_stats()
+    article_workers.shutdown()
+    if session.fetch_engine:
+        session.fetch_engine.print_stats()
+    get_decode_cache().print_stats()
+    if session.rss_cache:
+        session.rss_cache.print_stats()
+    google_rate_limiter.print_stats()
+    article_registry.print_stats()
+    run_stats.print_stats()
+    if tape:
+        tape.print_stats()
+        tape.close()
+    
+    # RUN REPORT - machine-readable json next to each output csv (one per list and chunk)
+    # stage timings and shared caches are for the whole process, i.e. every list in the run
+    for risk_list, search_terms_df, _ in runs:
+        report_path = run_stats.write_report(
+            report_path_for(output_paths[risk_list.name]),
+            script=risk_list.script, risk_type=risk_list.name, risk_lists=[r.name for r in risk_lists], chunk_id=chunk_id,
+            chunk_start=args.chunk_start, chunk_end=args.chunk_end, debug_mode=DEBUG_MODE,
+            search_terms=len(search_terms_df), articles_collected=len(articles[risk_list.name]),
+            records_in_output=record_counts[risk_list.name],
+            decode_cache=get_decode_cache().stats(), google_rate_limiter=google_rate_limiter.stats(),
+            rss_validator_cache=session.rss_cache.stats() if session.rss_cache else None,
+            article_registry=article_registry.stats(), keyword_extractor=article_workers.keyword_stats,
+            article_workers=article_workers.stats(),
+            fetch_engine=session.fetch_engine.stats() if session.fetch_engine else {'engine': 'thread'},
+            cassette=tape.stats() if tape else None,
+        )
+        print(f"Run report written to {report_path}")
+    session.close()
+    
+    # end time for reference
+    print(f"Completed at: {dt.datetime.now()}")
+    print("*" * 50)
+
+def load_search_terms(risk_list, chunk_start=0, chunk_end=None):
+    # load and decode search terms from CSV - ORIGINAL LOGIC
+    encoded_csv_path = risk_list.encoded_csv
+    risk_id_col = risk_list.risk_id_col
+    try:
+        usecols = [risk_id_col, 'SEARCH_TERM_ID', 'ENCODED_TERMS']
+        df = pd.read_csv(f'data/{encoded_csv_path}', encoding='utf-8', usecols=usecols)
+        df[risk_id_col] = pd.to_numeric(df[risk_id_col], downcast='integer', errors='coerce')
+        
+        # ORIGINAL DECODING LOGIC
+        df['SEARCH_TERMS'] = df['ENCODED_TERMS'].apply(process_encoded_search_terms)
+
+        # CHUNKING 2 - filter rows based on args
+        start = chunk_start
+        end = chunk_end if chunk_end is not None else len(df)
+        df = df.iloc[start:end].reset_index(drop=True)
+        if DEBUG_MODE:
+            print(f"DEBUG: Filtering to terms {start}:{end} ({len(df)} terms)")
+        
+        print(f"Loaded {len(df)} search terms from {encoded_csv_path}")
+        valid_terms = df['SEARCH_TERMS'].dropna()
+        print(f"Valid search terms ({len(valid_terms)}): {valid_terms.head().tolist()}")
+        
+        # filter out rows with invalid search terms
+        valid_df = df.dropna(subset=['SEARCH_TERMS'])
+        if valid_df.empty:
+            print("ERROR!!! No valid search terms after decoding!!")
+            sys.exit(1)
+        return valid_df
+    except FileNotFoundError:
+        print(f"ERROR!!! data/{encoded_csv_path} not found!!")
+        sys.exit(1)
+    except Exception as e:
+        print(f"ERROR loading data/{encoded_csv_path}: {e}")
+        sys.exit(1)
+
+# this is the MAIN processing loop - every risk list's terms go through one pipeline
+# runs: [(risk_list, search_terms_df, existing_links)]; returns {risk list name: articles df}
+# streaming pipeline: rss -> decode -> download -> parse -> nlp, each stage with its own workers and bounded queue
+# settle_saved=False leaves the items that became rows unsettled in the seen item store (rows saved to a chunk csv)
+def process_risk_lists(runs, session, sources, settle_saved=True):
+    print(f"Processing {sum(len(df) for _, df, _ in runs)} search terms from {len(runs)} risk list(s)...")
+    
+    # setup newspaper config
+    config = Config()
+    user_agent = random.choice(session.user_agents)
+    config.browser_user_agent = user_agent
+    config.enable_image_fetching = False  # faster without images!
+    config.request_timeout = 10 if DEBUG_MODE else 20
+    
+    # set dates for search (using SEARCH_DAYS global constant)
+    # a replayed run keeps the date it was recorded on, or the window would filter out everything it saw
+    now = dt.date.today()
+    tape = cassette.active_cassette
+    if tape and tape.replaying and 'run_date' in tape.meta:
+        now = dt.date.fromisoformat(tape.meta['run_date'])
+    elif tape:
+        tape.put_meta('run_date', now.isoformat())
+    # rss items published before this are dropped before decoding - the search window, never past retention
+    yesterday = max(now - dt.timedelta(days=SEARCH_DAYS), now - dt.timedelta(days=RETENTION_DAYS))
+    
+    existing = {risk_list.name: existing_links for risk_list, _, existing_links in runs}
+    records = {risk_list.name: [] for risk_list, _, _ in runs}
+    if all(df.empty for _, df, _ in runs):
+        return {name: pd.DataFrame() for name in records}
+    
+    # QUERY PLANNER - identical queries across lists and terms are fetched once (see query_planner.py)
+    plans, planner_stats = plan_queries(runs)
+    
+    # SEEN ITEMS - rss items already settled for a term in an earlier run (see cache.SeenItemStore)
+    seen_store = seen_store_for(tape)
+    
+    # parse / keywords / vader run in worker processes (see article_workers.py) - started before the pipeline threads
+    article_workers = get_article_workers()
+    
+    # per-term dedup sets and counters - items of many terms are in flight at once
+    term_stats = {}
+    term_lock = threading.Lock()
+    
+    # STAGE 1 - rss fetch + pre-decode filters for one planned query, on behalf of every term that asked for it
+    def rss_stage(plan):
+        targets = []
+        for risk_list, row in plan.requesters:
+            risk_id = row[risk_list.risk_id_col]
+            search_term_id = row['SEARCH_TERM_ID']
+            print(f"processing search term (ID: {risk_id}, SEARCH_TERM_ID: {search_term_id}) - '{row['SEARCH_TERMS'][:50]}...'")  # dropped idx since parallel
+            
+            stats = {'found': 0, 'seen_before': 0, 'skipped_before_decode': 0, 'skipped_existing': 0,
+                     'filtered_before_decode': 0, 'outside_window': 0, 'over_budget': 0, 'processed': 0,
+                     'seen_urls': set(), 'seen_titles': set()}
+            with term_lock:
+                term_stats[(risk_list.name, risk_id, search_term_id)] = stats
+            seen_term = f"{risk_list.name}:{risk_id}:{normalize_query(row['SEARCH_TERMS'])}"
+            targets.append({'risk_list': risk_list.name, 'risk_id': risk_id, 'search_term_id': search_term_id,
+                            'search_term': row['SEARCH_TERMS'], 'term_stats': stats,
+                            'existing_links': existing[risk_list.name], 'seen_term': seen_term,
+                            'seen': seen_store.seen_for(seen_term) if seen_store else set()})
+        
+        # Get Google News articles - one fetch for the query, each item tagged with the terms that keep it
+        return get_google_news_articles(plan.query, session, MAX_ARTICLES_PER_TERM, now, yesterday, targets, sources,
+                                        attribute=plan.batched, seen_store=seen_store)
+    
+    # STAGE 2 - decode the google link once, then the filters that need the publisher url, then one article per term
+    def decode_stage(item):
+        targets = item['targets']
+        if len(targets) > 1 and not peek_decoded_url(item['link']):
+            run_stats.count('decode_requests_saved', 2 * (len(targets) - 1))  # the decoder makes two google requests
+        # Decode the Google News encoded URL - cached across runs, see utils.decode_google_news_url
+        decoded_url = decode_google_news_url(item['link'])
+        if not decoded_url:
+            run_stats.count('decode_failed')
+            return []
+        wanted = []
+        for target in targets:
+            if target['existing_links'].contains(target['risk_id'], decoded_url):
+                with term_lock:
+                    target['term_stats']['skipped_existing'] += 1
+                run_stats.count('skipped_existing_after_decode')
+                settle_seen(seen_store, target, item)
+            else:
+                wanted.append(target)
+        if not wanted:
+            return []
+        article = filter_decoded_article(item, decoded_url, sources)
+        if article is None:
+            run_stats.count('filtered_after_decode')
+            for target in wanted:
+                settle_seen(seen_store, target, item)
+            return []
+        articles = []
+        for target in wanted:
+            with term_lock:
+                target['term_stats']['found'] += 1
+            articles.append(dict(article, risk_list=target['risk_list'], risk_id=target['risk_id'],
+                                 search_term_id=target['search_term_id'], search_term=target['search_term'],
+                                 term_stats=target['term_stats'], seen_term=target['seen_term']))
+        return articles
+    
+    # STAGE 3 - per-term dedup and url pattern filter, then download (once per url per run via article_registry)
+    def download_stage(article):
+        url = article['url']
+        title = article['title']
+        
+        # deduplicate by canonical url and title for this search term
+        url_key = canonicalize_url(url)
+        title_key = title.lower().strip()[:100]  # limit title length for comparison
+        stats = article['term_stats']
+        with term_lock:
+            duplicate = url_key in stats['seen_urls'] or title_key in stats['seen_titles']
+            stats['seen_urls'].add(url_key)
+            stats['seen_titles'].add(title_key)
+        if duplicate:
+            run_stats.count('duplicate_in_term')
+            settle_seen(seen_store, article, article)
+            if DEBUG_MODE:
+                print(f"  ---Skipping duplicate: '{title[:50]}...' ({url[:50]}...)")
+            return []
+        
+        # PRE-FILTER: Skip known problematic URL patterns from manual review
+        # Add as needed based on result review
+        problematic_patterns = [
+            '/video/', '/videos/', '/watch/',
+            'wsj.com/subscriptions', 'bloomberg.com/newsletters',
+            'reuters.com/video', 'reuters.com/graphics'
+        ]
+        
+        if any(pattern in url.lower() for pattern in problematic_patterns):
+            run_stats.count('problematic_url')
+            settle_seen(seen_store, article, article)
+            if DEBUG_MODE:
+                print(f"  - Skipping problematic URL: {title[:50]}... ({url[:50]}...)")
+            return []
+        
+        # ARTICLE REGISTRY - another term may already have downloaded (or be downloading) this url
+        content, owner = article_registry.claim(url)
+        if not owner:
+            run_stats.count('registry_reuse')
+            return [dict(article, content=content)] if content else []
+        
+        # async engine: hand the download to the event loop and take the next article - the pipeline
+        # collects the future, so the stage's threads never sit waiting on a publisher
+        if session.fetch_engine:
+            return session.fetch_engine.submit(fetch_article(article))
+        
+        # download through the pooled session (keep-alive, retries, per-host caps)
+        try:
+            html = session.fetch_html(url, timeout=config.request_timeout)
+        except Exception as e:
+            return download_failed(article, e)
+        return [dict(article, html=html)]
+    
+    async def fetch_article(article):
+        try:
+            html = await session.fetch_html_async(article['url'], timeout=config.request_timeout)
+        except Exception as e:
+            return download_failed(article, e)
+        return [dict(article, html=html)]
+    
+    def download_failed(article, e):
+        article_registry.publish(article['url'], None)
+        run_stats.count('download_failed')
+        if DEBUG_MODE:
+            print(f"  ---Download failed for '{article['title'][:50]}...': {e}")
+        return []
+    
+    # STAGE 4 - newspaper parse in a worker process; publishing to the registry releases other terms waiting on this url
+    def parse_stage(article):
+        if 'content' in article:
+            return canonical_dedup(article)  # parsed for another term already
+        content = None
+        try:
+            html = article.pop('html')
+            with run_stats.timed('parse') as call:
+                call.bytes = len(html) if html else 0
+                content = article_workers.parse(article['url'], html)
+                call.failed = content is None
+        finally:
+            article_registry.publish(article['url'], content)
+        if content is None:
+            run_stats.count('parse_no_content')
+            return []
+        return canonical_dedup(dict(article, content=content))
+    
+    # CANONICAL DEDUP - the page's rel=canonical can reveal a duplicate the url alone didn't:
+    # a story already saved for this risk, or one this term already has under another url
+    def canonical_dedup(article):
+        canonical = usable_canonical(article['url'], article['content'].get('canonical_link'))
+        if not canonical:
+            return [article]
+        canonical_key = canonicalize_url(canonical)
+        if canonical_key == canonicalize_url(article['url']):
+            return [article]
+        if existing[article['risk_list']].contains(article['risk_id'], canonical):
+            with term_lock:
+                article['term_stats']['skipped_existing'] += 1
+            run_stats.count('skipped_existing_canonical')
+            settle_seen(seen_store, article, article)
+            return []
+        stats = article['term_stats']
+        with term_lock:
+            duplicate = canonical_key in stats['seen_urls']
+            stats['seen_urls'].add(canonical_key)
+        if duplicate:
+            run_stats.count('duplicate_canonical')
+            settle_seen(seen_store, article, article)
+            return []
+        return [article]
+    
+    # STAGE 5 - batched KeyBERT fallback + VADER in the nlp worker, then quality scoring -> output rows
+    def nlp_stage(batch):
+        # KEYWORD EXTRACT FALLBACK - one KeyBERT pass for every article in the batch newspaper found no keywords for
+        # content is shared through the registry, so an article another term already handled is not re-embedded
+        needs_keywords = list({id(a['content']): a['content'] for a in batch
+                               if not a['content']['keywords'] and a['content']['text']}.values())
+        result = article_workers.analyze([c['text'] for c in needs_keywords],
+                                         [a['title'] + " " + a['content']['summary'] for a in batch])
+        if needs_keywords:
+            run_stats.record('keywords', result['keyword_seconds'], failed=result['keyword_error'] is not None)
+            if result['keyword_error']:
+                print(f"  ---keyword extraction failed: {result['keyword_error']}")
+            else:
+                for content, keywords in zip(needs_keywords, result['keywords']):
+                    content['keywords'] = keywords
+                    content['text'] = None  # only needed for keywords - don't hold full texts for the whole run
+        for seconds in result['vader_seconds']:
+            run_stats.record('vader', seconds)
+        
+        rows = []
+        for article, sentiment in zip(batch, result['sentiment']):
+            record = build_article_record(article, sentiment, sources.whitelist)
+            if record is None or settle_saved:
+                settle_seen(seen_store, article, article)
+            if record is not None:
+                rows.append((article['risk_list'], record))
+                with term_lock:
+                    article['term_stats']['processed'] += 1
+                run_stats.count('records_built')
+        return rows
+    
+    pipeline = Pipeline([
+        Stage('rss', rss_stage, workers=TERM_WORKERS),  # low to avoid google limits
+        Stage('decode', decode_stage, workers=DECODE_WORKERS),
+        Stage('download', download_stage, workers=DOWNLOAD_WORKERS,
+              max_pending=session.fetch_engine.max_in_flight if session.fetch_engine else None),
+        Stage('parse', parse_stage, workers=article_workers.workers or PARSE_WORKERS),  # one thread per parse process
+        Stage('nlp', nlp_stage, workers=1, batch_size=KEYBERT_BATCH_SIZE),
+    ], sink=lambda output: records[output[0]].append(output[1]))
+    pipeline.run(plans)
+    pipeline.print_stats()
+    run_stats.add_section('pipeline', pipeline.stats())
+    
+    planner_stats['rss_requests_saved'] = run_stats.counters.get('rss_requests_saved', 0)
+    planner_stats['decode_requests_saved'] = run_stats.counters.get('decode_requests_saved', 0)
+    run_stats.add_section('query_planner', planner_stats)
+    print(f"Query planner: {planner_stats['coalesced_terms']} coalesced terms saved {planner_stats['rss_requests_saved']} rss "
+          f"and {planner_stats['decode_requests_saved']} decoder google requests")
+    
+    for (name, risk_id, search_term_id), stats in term_stats.items():
+        skipped = stats['skipped_before_decode'] + stats['skipped_existing']
+        print(f"  {name} term (ID: {risk_id}, SEARCH_TERM_ID: {search_term_id}): {stats['found']} new articles, "
+              f"{stats['seen_before']} seen in earlier runs, skipped {skipped} already saved ({stats['skipped_before_decode']} before decode), "
+              f"filtered {stats['filtered_before_decode']} by publisher and {stats['outside_window']} by date before decode, "
+              f"{stats['over_budget']} over budget, processed {stats['processed']}")
+    
+    results = {}
+    for name, all_articles in records.items():
+        # debug early exit approx in parallel - collect and check total
+        if DEBUG_MODE and len(all_articles) >= 5:
+            all_articles = all_articles[:5]
+            print(f"DEBUG: limited to first 5 {name} articles total")
+        
+        if all_articles:
+            results[name] = pd.DataFrame(all_articles)
+            print(f"Total {name} articles collected: {len(results[name])}")
+        else:
+            print(f"No {name} articles to process")
+            results[name] = pd.DataFrame()
+    return results
+
+# rss stage for one query: fetch pages, drop items that can be rejected before decoding, then keep the
+# max_articles best by triage score for each term - the per-term budget for decode, download and parse
+# targets are the terms sharing this query (query_planner.py): each keeps its own existing links, counters
+# and budget, and every returned item carries item['targets'], the terms that kept it
+# attribute=True for an OR batch: an item only goes to the member terms its title matches
+# seen_store: items a term settled in an earlier run are dropped on sight, and items settled here are recorded
+def get_google_news_articles(search_term, session, max_articles, now, yesterday, targets, sources, attribute=False,
+                             seen_store=None):
+    # from original logic, fetch articles from Google News RSS
+    items_out = []
+    seen_items = set()  # the same item can repeat within a page or come back on a later one
+    pages_fetched = 0
+    candidates_for = [0] * len(targets)  # items each term would take, for the early stop
+    
+    def count(name):
+        for target in targets:
+            target['term_stats'][name] += 1
+    
+    def settle(item, indices=None):
+        for index in range(len(targets)) if indices is None else indices:
+            settle_seen(seen_store, targets[index], item)
+    
+    # RSS_PAGES pages of RSS_PAGE_SIZE results, the next ones fetched while this one is triaged
+    # rate limit lives in utils.google_get (shared across all term threads and page fetches)
+    # single fetch + parse per page - title, link, pubDate and <source> name/url come from the same item
+    pages = fetch_google_news_rss_pages(search_term, session, SEARCH_DAYS)
+    try:
+        for page, start, items in pages:
+            pages_fetched += 1
+            print(f"    ---Page {page+1}: found {len(items)} potential articles")
+            run_stats.count('rss_items', len(items))
+            unseen_on_page = 0
+            new_on_page = 0
+            
+            for item_idx, item in enumerate(items):
+                # extract title and source - checked before decoding so skipped items cost nothing
+                title_text = item['title']
+                source_text = item['source_name']
+                
+                if not title_text or not source_text or not item['link']:
+                    continue
+                
+                item_key = item['guid'] or item['link']
+                if item_key in seen_items:
+                    run_stats.count('rss_duplicate_item')
+                    continue
+                seen_items.add(item_key)
+                new_on_page += 1
+                
+                # SEEN ITEMS - settled for these terms in an earlier run: nothing left to do with it
+                item['seen_keys'] = seen_item_keys(item)
+                item['skip_for'] = {index for index, target in enumerate(targets)
+                                    if not target['seen'].isdisjoint(item['seen_keys'])}
+                for index in item['skip_for']:
+                    targets[index]['term_stats']['seen_before'] += 1
+                if len(item['skip_for']) == len(targets):
+                    run_stats.count('seen_before_rss')
+                    continue
+                unseen_on_page += 1
+                
+                # basic filtering
+                if len(title_text) < 10:
+                    continue
+                
+                # DATE WINDOW - drop items published before the search window without decoding them
+                # unparseable dates are kept, as before; the published date also backs up a missing article date
+                published = parse_rss_date(item['pub_date'])
+                if published is None:
+                    if DEBUG_MODE:
+                        print(f"WARNING! Date Error: {item['pub_date']}")
+                elif published.date() < yesterday:
+                    count('outside_window')
+                    run_stats.count('outside_window_before_decode')
+                    settle(item)
+                    continue
+                item['published'] = published
+                
+                # PUBLISHER FILTERS - the rss <source> gives the publisher name and domain, so the blocklist, the
+                # domain filters and the paywall/credibility lookups run here and only surviving items pay for a decode
+                source_domain = publisher_domain(item['source_url']) if item['source_url'] else None
+                reason = publisher_filter_reason(source_text, source_domain, sources)
+                if reason:
+                    count('filtered_before_decode')
+                    run_stats.count('blocked_source' if reason == 'blocked source' else 'filtered_before_decode')
+                    settle(item)
+                    if DEBUG_MODE:
+                        print(f"    - Skipping before decode: {reason}: {source_text} ({source_domain})")
+                    continue
+                if source_domain:
+                    item['paywalled'], item['credibility_type'] = sources.lookup(source_domain)
+                
+                # OR BATCH ATTRIBUTION - the member terms the title matches, by the quality score's relevance test
+                # unmatched terms are skipped but not settled: the term may only be in the article body, which
+                # was never checked, so a later run (or an unbatched query) still gets to look at the item
+                if attribute:
+                    title_lower = title_text.lower()
+                    unmatched = {index for index, target in enumerate(targets) if index not in item['skip_for']
+                                 and not search_term_matches(target['search_term'], title_lower)}
+                    item['skip_for'] |= unmatched
+                    if len(item['skip_for']) == len(targets):
+                        run_stats.count('or_batch_unattributed')
+                        continue
+                
+                # EXISTING LINKS - skip articles already saved for a term's risk without decoding or downloading
+                known_url = peek_decoded_url(item['link'])
+                if known_url:
+                    for index, target in enumerate(targets):
+                        if index not in item['skip_for'] and target['existing_links'].contains(target['risk_id'], known_url):
+                            item['skip_for'].add(index)
+                            target['term_stats']['skipped_before_decode'] += 1
+                            run_stats.count('skipped_existing_before_decode')
+                            settle_seen(seen_store, target, item)
+                    if len(item['skip_for']) == len(targets):
+                        continue
+                
+                # add google index for article position (page-based + item position)
+                # a batched item is ranked for the best of the terms it was attributed to
+                item['google_index'] = start + item_idx + 1
+                terms = {target['search_term'] for index, target in enumerate(targets)
+                         if index not in item['skip_for']} if attribute else [search_term]
+                item['triage_score'] = max(calculate_triage_score(
+                    title_text, term, item['google_index'], item.get('credibility_type'), item.get('paywalled', False)
+                ) for term in terms)
+                items_out.append(item)
+                for index in range(len(targets)):
+                    if index not in item['skip_for']:
+                        candidates_for[index] += 1
+            
+            # REPEATED PAGE - nothing on this page was new to the term, so the feed is ignoring or overlapping
+            # start= and later pages would only spend rate-limited requests on the same items
+            if items and not new_on_page:
+                run_stats.count('rss_repeated_page')
+                print(f"    ---Page {page+1} only repeated earlier items: stopping '{search_term[:30]}...'")
+                break
+            # EARLY STOP - enough candidates for every term's budget, so later pages would only be cut by triage
+            if max_articles and min(candidates_for) >= max_articles:
+                break
+            # UNCHANGED QUERY - every item on the first page was settled before, so the feed hasn't moved
+            # since the last run and later pages are not fetched either
+            if page == 0 and items and not unseen_on_page and any(target['seen'] for target in targets):
+                run_stats.count('seen_term_short_circuit')
+                print(f"    ---Unchanged since the last run: stopping '{search_term[:30]}...' after page 1")
+                break
+    except requests.exceptions.RequestException as e:
+        print(f"SPOTTED REQUEST ERROR - term {search_term[:30]}... after {len(items_out)} candidates: {e}")
+    finally:
+        pages.close()  # cancels pages fetched ahead that are no longer needed
+    if len(targets) > 1:
+        run_stats.count('rss_requests_saved', pages_fetched * (len(targets) - 1))
+    
+    # TRIAGE - only the top max_articles items go on for each term; ties keep google's order
+    for item in items_out:
+        item['targets'] = []
+    for index, target in enumerate(targets):
+        candidates = [item for item in items_out if index not in item['skip_for']]
+        if max_articles and len(candidates) > max_articles:
+            candidates.sort(key=lambda item: (-item['triage_score'], item['google_index']))
+            target['term_stats']['over_budget'] += len(candidates) - max_articles
+            run_stats.count('over_budget_before_decode', len(candidates) - max_articles)
+            if DEBUG_MODE:
+                for item in candidates[max_articles:]:
+                    print(f"    - Over budget (triage {item['triage_score']}): '{item['title'][:50]}...'")
+            candidates = candidates[:max_articles]
+        for item in candidates:
+            item['targets'].append(target)
+        if len(targets) == 1:
+            return candidates
+    return [item for item in items_out if item['targets']]
+
+# guid + title/source fingerprint of an rss item - its keys in the seen item store
+def seen_item_keys(item):
+    fingerprint = hashlib.sha1(f"{item['title'].strip().lower()}|{(item['source_name'] or '').strip().lower()}".encode())
+    keys = (f"f:{fingerprint.hexdigest()[:16]}",)
+    return (f"g:{item['guid']}",) + keys if item['guid'] else keys
+
+# the seen item store for this run, or None - not used while recording or replaying, so a cassette always
+# captures and replays the full path, nor in DEBUG_MODE, which skips existing links and keeps only 5 articles
+# (its settled items were never saved); process_risk_lists marks items, main() flushes them after the saves
+def seen_store_for(tape):
+    return None if tape or DEBUG_MODE else get_seen_store(SEARCH_DAYS + 1)
+
+# an item's outcome for a term is final (stored, filtered or already saved) - later runs drop it on sight
+def settle_seen(seen_store, target, item):
+    if seen_store:
+        seen_store.mark(target['seen_term'], item['seen_keys'])
+
+# publisher domain of a url, as the filters and source lists expect it
+def publisher_domain(url):
+    return urlparse(url).netloc.replace('www.', '')
+
+# FILTER SERIES for reliable TLDs (.com, .edu, .org, .net, .gov) and exclude international paths
+# domain-level only, so it runs on the rss <source url> before decoding and again on the decoded url
+VALID_TLDS = ('.com', '.edu', '.org', '.net', '.gov', '.co', '.news', '.info', '.biz')
+
+def domain_filter_reason(full_domain):
+    # FILTER #1 = Reliable TLDs only
+    if not any(full_domain.endswith(ext) for ext in VALID_TLDS):
+        return "invalid domain extension"
+    # FILTER #2 = No international paths/subdomains
+    if re.search(r'\.[a-z]{2}$|\.[a-z]{2}\.[a-z]{2}$', full_domain.lower()):
+        return "international path or subdomain"
+    return None
+
+# blocklist (filter_out_sources.csv) first, then the domain filters; allowlisted publishers
+# (filter_in_sources.csv, sources.csv) pass both
+def publisher_filter_reason(source_name, full_domain, sources):
+    if sources.is_allowed(source_name, full_domain):
+        return None
+    if sources.is_blocked(source_name, full_domain):
+        return "blocked source"
+    return domain_filter_reason(full_domain) if full_domain else None
+
+# decode stage filters that need the publisher url; returns the article dict or None to drop it
+def filter_decoded_article(item, decoded_url, sources):
+    title_text = item['title']
+    source_text = item['source_name']
+    google_index = item['google_index']
+    
+    # extract domain from URL for filtering
+    full_domain = publisher_domain(decoded_url)
+    
+    # domain filters already ran on the rss source url - this catches items without one, or a decoded
+    # url on a different domain than its source
+    reason = publisher_filter_reason(source_text, full_domain, sources)
+    if reason:
+        print(f"Skipping {decoded_url[:50]}... ({reason}: {full_domain})")
+        return None
+    # FILTER #3 = No translated to English articles
+    if "/en/" in decoded_url.lower():
+        # if DEBUG_MODE:
+        print(f"Skipping {decoded_url[:50]}... (Translated article)")
+        return None
+    
+    # paywall/credibility come from the rss source domain when there was one
+    if 'paywalled' in item:
+        is_paywalled, credibility_type = item['paywalled'], item['credibility_type']
+    else:
+        is_paywalled, credibility_type = sources.lookup(full_domain)
+    
+    print(f"    - Added article: '{title_text[:50]}...' from {source_text} (domain: {get_source_name(decoded_url)}, full_domain: {full_domain}, index: {google_index}, paywalled: {is_paywalled}, credibility: {credibility_type})")
+    return {
+        'url': decoded_url,
+        'title': title_text,
+        'google_index': google_index,
+        'paywalled': is_paywalled,
+        'credibility_type': credibility_type,
+        'pretty_source': source_text,  # e.g. "Financial Times" from the rss <source> element
+        'source_url': item['source_url'],
+        'rss_published': item['published'],
+        'seen_keys': item['seen_keys'],
+    }
+
+# sentiment, scoring and final row for one (article, search term) pair
+def build_article_record(article, sentiment, whitelist):
+    try:
+        url = article['url']
+        title = article['title']
+        search_term = article['search_term']
+        risk_id = article['risk_id']
+        search_term_id = article['search_term_id']
+        google_index = article.get('google_index', 0)  # get index from article to see the sort order
+        is_paywalled = article.get('paywalled', False)
+        credibility_type = article.get('credibility_type', 'Relevant Article')
+        content = article['content']
+        # the row is stored (and keyed, see storage.row_key) on the page's rel=canonical url when it's usable,
+        # so the same story reached through different urls is one row - else the fetched url (kept in SOURCE_URL)
+        link = usable_canonical(url, content.get('canonical_link')) or url
+        summary = content['summary']
+        keywords = content['keywords']
+        if DEBUG_MODE:
+            print(f"    - Extracted keywords for '{title[:50]}...': {keywords}")
+            print(f"    - Article text length: {content['text_length']} chars")
+        
+        # sentiment analysis - VADER scores for title + summary come from the nlp worker
+        sentiment_category = 'Negative' if sentiment['compound'] <= -0.05 else 'Positive' if sentiment['compound'] >= 0.05 else 'Neutral'
+        
+        # quality scoring
+        quality_scores = calculate_quality_score(
+            title, summary, url, [search_term], whitelist
+        )
+        
+        # include all articles, keeping quality score for review
+        print(f"DEBUG: Assigning SEARCH_TERM_ID={search_term_id} to article '{title[:50]}...' (RISK_ID={risk_id})") #STID to delete later!
+
+        # PRETTY SOURCE NAME
+        # final formatting before write
+        # source_name = get_source_name(url).capitalize()
+        source_name = article.get('pretty_source', get_source_name(url)).capitalize()
+        # article is the local var - use it for pretty_source fallback
+        
+        # article date from the page, else the rss pubDate (utc), else now
+        rss_published = article.get('rss_published')
+        publish_date = content['publish_date'] or (rss_published.replace(tzinfo=None) if rss_published else dt.datetime.now())
+        formatted_publish_date = pd.to_datetime(publish_date).strftime('%Y-%m-%d %H:%M:%S')
+
+        return {
+            'RISK_ID': risk_id,  # proper risk id mapping
+            'SEARCH_TERM_ID': search_term_id,  #STID to delete later!
+            'GOOGLE_INDEX': google_index,  # google news position for this article
+            'TITLE': title,
+            'LINK': link,
+            'PUBLISHED_DATE': formatted_publish_date,
+            'SUMMARY': summary[:500],  # truncate for CSV size
+            'KEYWORDS': ', '.join(keywords) if keywords else '',
+            'SENTIMENT_COMPOUND': sentiment['compound'],
+            'SENTIMENT': sentiment_category,
+            'SOURCE': source_name,
+            'SOURCE_URL': url,
+            'PAYWALLED': is_paywalled,
+            'CREDIBILITY_TYPE': credibility_type,
+            'QUALITY_SCORE': quality_scores['total_score'],
+            # add individual score components
+            **{f'SCORE_{k.upper()}': v for k, v in quality_scores.items() if k != 'total_score'},
+        }
+            
+    except Exception as e:
+        if DEBUG_MODE:
+            print(f"  ---error scoring article '{title[:50] if 'title' in locals() else 'Unknown'}...': {e}")
+        return None
+
+if __name__ == '__main__':
+    main()
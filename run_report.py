@@ -0,0 +1,120 @@
+# per-stage timing and counters for one scraper run, written as a json report next to the output csv
+# every stage records wall time per call, call/error counts and bytes, so a slow chunk shows whether
+# its time went to rss fetches, decoding, downloads, parsing, keywords, vader or the final save
+
+import json
+import threading
+import time
+import datetime as dt
+from contextlib import contextmanager
+from pathlib import Path
+
+# handle yielded by RunStats.timed - the caller fills in bytes or marks a soft failure (None result etc.)
+class _Call:
+    __slots__ = ('bytes', 'failed')
+
+    def __init__(self):
+        self.bytes = 0
+        self.failed = False
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+class RunStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}  # name -> {'calls', 'errors', 'bytes', 'seconds', 'latencies'}
+        self.counters = {}
+        self.sections = {}  # extra stats blocks, e.g. the pipeline's per-stage queue stats
+        self.started_at = dt.datetime.now()
+        self._start = time.perf_counter()
+
+    def _stage(self, name):
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = {'calls': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.0, 'latencies': []}
+        return stage
+
+    def record(self, name, seconds, failed=False, nbytes=0):
+        with self._lock:
+            stage = self._stage(name)
+            stage['calls'] += 1
+            stage['errors'] += int(failed)
+            stage['bytes'] += nbytes
+            stage['seconds'] += seconds
+            stage['latencies'].append(seconds)
+
+    # with run_stats.timed('download') as call: ... call.bytes = len(html)
+    # exceptions count as errors and are re-raised; set call.failed for failures that don't raise
+    @contextmanager
+    def timed(self, name):
+        call = _Call()
+        start = time.perf_counter()
+        try:
+            yield call
+        except Exception:
+            call.failed = True
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, call.failed, call.bytes)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_section(self, name, data):
+        with self._lock:
+            self.sections[name] = data
+
+    def stage_stats(self):
+        with self._lock:
+            stages = {name: dict(stage, latencies=sorted(stage['latencies'])) for name, stage in self._stages.items()}
+        report = {}
+        for name, stage in stages.items():
+            latencies = stage['latencies']
+            report[name] = {
+                'calls': stage['calls'],
+                'errors': stage['errors'],
+                'bytes': stage['bytes'],
+                'total_seconds': round(stage['seconds'], 3),
+                'p50_seconds': round(_percentile(latencies, 0.50), 4),
+                'p95_seconds': round(_percentile(latencies, 0.95), 4),
+                'max_seconds': round(latencies[-1], 4) if latencies else 0.0,
+            }
+        return report
+
+    # `extra` holds run metadata and the stats of the shared services (cache, limiter, registry, pipeline)
+    def write_report(self, path, **extra):
+        report = {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': dt.datetime.now().isoformat(timespec='seconds'),
+            'wall_seconds': round(time.perf_counter() - self._start, 2),
+            **extra,
+            'stages': self.stage_stats(),
+            'counters': dict(sorted(self.counters.items())),
+            **self.sections,
+        }
+        path = Path(path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=str)
+        tmp_path.replace(path)
+        return path
+
+    def print_stats(self):
+        print("Stage timings:")
+        for name, stats in self.stage_stats().items():
+            print(f"    {name:<13} calls={stats['calls']:<5} errors={stats['errors']:<4} "
+                  f"total={stats['total_seconds']:.1f}s p50={stats['p50_seconds']:.3f}s "
+                  f"p95={stats['p95_seconds']:.3f}s max={stats['max_seconds']:.3f}s bytes={stats['bytes']}")
+
+# report path for an output csv: output/<name>[_chunk_N].csv -> output/<name>[_chunk_N]_report.json
+def report_path_for(output_path):
+    output_path = Path(output_path)
+    return output_path.with_name(f"{output_path.stem}_report.json")
+
+# shared per-process instance, like keyword_extractor / google_rate_limiter in utils
+run_stats = RunStats()
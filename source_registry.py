@@ -0,0 +1,133 @@
+# SOURCE REGISTRY
+# every publisher list under data/ loaded once, normalized and compiled into hash lookups:
+#  - blocklist  (filter_out_sources.csv)  - publisher names from the rss <source>, plus any entries that are domains
+#  - allowlist  (filter_in_sources.csv domains, sources.csv names) - never dropped by the blocklist or domain filters
+#  - paywall    (source_and_type.csv IS_PAYWALLED + paywalled_sources.csv)
+#  - credibility (source_and_type.csv CREDIBILITY_TYPE)
+# domain lookups match on suffix, so markets.ft.com finds ft.com - one set lookup per domain label
+
+import re
+import unicodedata
+from pathlib import Path
+import pandas as pd
+
+DEFAULT_CREDIBILITY = 'Relevant Article'
+DOMAIN_RE = re.compile(r'^[a-z0-9-]+(\.[a-z0-9-]+)+$')
+
+# lowercase, unicode-normalized, single-spaced - "The  Wall Street Journal" -> "the wall street journal"
+def normalize_name(name):
+    if name is None or pd.isna(name):
+        return ''
+    name = unicodedata.normalize('NFKC', str(name)).replace('\ufeff', '')
+    return ' '.join(name.lower().split())
+
+# bare host for a url or domain - "https://www.FT.com/markets" -> "ft.com"
+def normalize_domain(value):
+    value = normalize_name(value)
+    value = re.sub(r'^[a-z][a-z0-9+.-]*://', '', value)
+    value = value.split('/', 1)[0].split(':', 1)[0].strip('.')
+    return re.sub(r'^(www\d*|m)\.', '', value)
+
+def looks_like_domain(value):
+    return bool(DOMAIN_RE.match(normalize_domain(value))) and ' ' not in normalize_name(value)
+
+# domain -> value map that also answers for subdomains of its entries
+class DomainMap:
+    def __init__(self):
+        self._entries = {}
+
+    def add(self, domain, value=True):
+        domain = normalize_domain(domain)
+        if domain:
+            self._entries[domain] = value
+
+    def get(self, domain, default=None):
+        labels = normalize_domain(domain).split('.')
+        for i in range(len(labels) - 1):  # never match on the bare tld
+            value = self._entries.get('.'.join(labels[i:]))
+            if value is not None:
+                return value
+        return default
+
+    def __contains__(self, domain):
+        return self.get(domain) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+def _read_source_csv(path):
+    path = Path(path)
+    if not path.exists():
+        print(f"Warning: source list {path} not found")
+        return pd.DataFrame()
+    try:
+        df = pd.read_csv(path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    except Exception as e:
+        print(f"Warning: Could not load source list {path}: {e}")
+        return pd.DataFrame()
+    df.columns = [normalize_name(c).upper() for c in df.columns]
+    return df
+
+class SourceRegistry:
+    def __init__(self, data_dir='data'):
+        data_dir = Path(data_dir)
+        self.blocked_names = set()
+        self.blocked_domains = DomainMap()
+        self.allowed_names = set()
+        self.allowed_domains = DomainMap()
+        self.paywalled = DomainMap()
+        self.credibility = DomainMap()
+        self.whitelist = set()  # mainstream domains for the quality score bonus (calculate_quality_score)
+
+        for name in _read_source_csv(data_dir / 'filter_out_sources.csv').get('SOURCE_NAME', []):
+            if looks_like_domain(name):
+                self.blocked_domains.add(name)
+            if normalize_name(name):
+                self.blocked_names.add(normalize_name(name))
+
+        for name in _read_source_csv(data_dir / 'filter_in_sources.csv').get('SOURCE_NAME', []):
+            if looks_like_domain(name):
+                self.allowed_domains.add(name)
+            elif normalize_name(name):
+                self.allowed_names.add(normalize_name(name))
+        for name in _read_source_csv(data_dir / 'sources.csv').get('SOURCE_NAME', []):
+            if normalize_name(name):
+                self.allowed_names.add(normalize_name(name))
+
+        source_df = _read_source_csv(data_dir / 'source_and_type.csv')
+        for _, row in source_df.iterrows():
+            domain = normalize_domain(row.get('SOURCE_NAME'))
+            if not domain:
+                continue
+            if str(row.get('IS_PAYWALLED', '')).strip() == '1':
+                self.paywalled.add(domain)
+            if row.get('CREDIBILITY_TYPE'):
+                self.credibility.add(domain, row['CREDIBILITY_TYPE'])
+            if row.get('CREDIBILITY_TYPE') == 'Mainstream':
+                self.whitelist.add(domain)
+        for name in _read_source_csv(data_dir / 'paywalled_sources.csv').get('SOURCE_NAME', []):
+            self.paywalled.add(name)
+
+        print(f"Source registry: {len(self.blocked_names)} blocked names ({len(self.blocked_domains)} domains), "
+              f"{len(self.allowed_domains)} allowed domains + {len(self.allowed_names)} names, "
+              f"{len(self.paywalled)} paywalled, {len(self.credibility)} credibility mappings, "
+              f"{len(self.whitelist)} whitelist")
+
+    # allowlisted publishers skip the blocklist and the TLD / international domain filters
+    def is_allowed(self, source_name=None, domain=None):
+        return (bool(domain) and domain in self.allowed_domains) or normalize_name(source_name) in self.allowed_names
+
+    def is_blocked(self, source_name=None, domain=None):
+        if self.is_allowed(source_name, domain):
+            return False
+        return normalize_name(source_name) in self.blocked_names or (bool(domain) and domain in self.blocked_domains)
+
+    def is_paywalled(self, domain):
+        return domain in self.paywalled
+
+    def credibility_type(self, domain, default=DEFAULT_CREDIBILITY):
+        return self.credibility.get(domain, default)
+
+    # (is_paywalled, credibility_type) for a publisher domain
+    def lookup(self, domain):
+        return self.is_paywalled(domain), self.credibility_type(domain)
@@ -0,0 +1,277 @@
+# append-only storage for the sentiment output csvs
+# a save appends only the day's new rows instead of reading, concatenating and rewriting the whole file:
+#  - <csv>.keys is a persistent index of (RISK_ID, TITLE, LINK) hashes, so dedup never reads the csv
+#  - <csv>.meta.json tracks row counts per published day, so retention knows how much has expired
+#  - expired rows move into append-only monthly archive partitions during an occasional compaction pass
+# both sidecars are derived data - if the csv changed behind our back (size or tail hash mismatch) they are
+# rebuilt; they are checked against the file's contents, not its mtime, and committed next to the csv, so a
+# fresh ci checkout reuses them instead of re-reading the csv and every archive partition
+# behaviour change from the old rewrite-everything save: rows are in append order, not sorted by date, and a
+# plain save only compacts once COMPACT_EXPIRED_FRACTION of the rows has expired - the publish step's
+# merge_chunks compacts whenever anything has, so the committed csv stays inside the retention window
+
+import csv
+import datetime as dt
+import hashlib
+import json
+import os
+from pathlib import Path
+import pandas as pd
+from canonical_url import canonicalize_url
+
+RETENTION_DAYS = 4 * 30  # 4-month rolling window
+COMPACT_EXPIRED_FRACTION = float(os.getenv('COMPACT_EXPIRED_FRACTION', '0.1'))  # compact once this share of rows has expired
+KEY_COLUMNS = ['RISK_ID', 'TITLE', 'LINK']
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+READ_CHUNK_ROWS = 100000
+TAIL_BYTES = 65536  # end of the csv hashed into the sidecars' file state - appends always change it
+KEY_VERSION = 2  # bump when row_key changes - sidecars built with another version are rebuilt
+
+# stable dedup key for one row - risk ids are compared as ints so "2" and 2 match, and links by their
+# canonical form so tracking params, amp pages, m./www. hosts and http/https variants are one row -
+# LINK is the page's rel=canonical url when it had one (risk_engine.build_article_record)
+def row_key(risk_id, title, link):
+    try:
+        risk = str(int(float(risk_id)))
+    except (TypeError, ValueError):
+        risk = str(risk_id)
+    raw = f"{risk}\x1f{title}\x1f{canonicalize_url(link)}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+def _keys_for(df):
+    return [row_key(r, t, l) for r, t, l in zip(df['RISK_ID'], df['TITLE'], df['LINK'])]
+
+def _count_days(days, dates):
+    for day, count in dates.dropna().dt.strftime('%Y-%m-%d').value_counts().items():
+        days[day] = days.get(day, 0) + int(count)
+
+class AppendOnlyCsvStore:
+    def __init__(self, csv_path, risk_type, archive=True):
+        self.csv_path = Path(csv_path)
+        self.keys_path = self.csv_path.with_name(self.csv_path.name + '.keys')
+        self.meta_path = self.csv_path.with_name(self.csv_path.name + '.meta.json')
+        self.archive_dir = self.csv_path.parent / 'archive'
+        self.risk_type = risk_type
+        self.archive = archive  # False drops expired rows instead (debug runs)
+        self.archive_keys_path = self.archive_dir / f'{risk_type}_sentiment_archive.keys'
+        self.keys = set()
+        self.meta = {'rows': 0, 'days': {}, 'columns': None}
+        self._archived_keys = None  # loaded lazily - only needed when expired rows show up
+
+    # the csv as the sidecars last saw it - same on any checkout of the same contents
+    def _file_state(self):
+        size = os.path.getsize(self.csv_path)
+        with open(self.csv_path, 'rb') as f:
+            f.seek(max(size - TAIL_BYTES, 0))
+            tail = hashlib.sha1(f.read()).hexdigest()
+        return {'size': size, 'tail_sha1': tail}
+
+    def _load(self):
+        if not self.csv_path.exists():
+            self.keys = set()
+            self.meta = {'rows': 0, 'days': {}, 'columns': None}
+            return
+        if self.meta_path.exists() and self.keys_path.exists():
+            with open(self.meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('file') == self._file_state() and meta.get('key_version') == KEY_VERSION:
+                self.meta = meta
+                with open(self.keys_path, encoding='utf-8') as f:
+                    self.keys = set(f.read().split())
+                return
+        print(f"Rebuilding storage index for {self.csv_path} (csv changed outside the store or new key format)")
+        self._rebuild()
+
+    # one streaming pass over the csv - only needed when the sidecars are missing or stale
+    def _rebuild(self):
+        keys = set()
+        days = {}
+        rows = 0
+        columns = list(pd.read_csv(self.csv_path, nrows=0, encoding='utf-8').columns)
+        for chunk in pd.read_csv(self.csv_path, dtype=str, keep_default_na=False,
+                                 chunksize=READ_CHUNK_ROWS, encoding='utf-8'):
+            keys.update(_keys_for(chunk))
+            _count_days(days, pd.to_datetime(chunk['PUBLISHED_DATE'], errors='coerce'))
+            rows += len(chunk)
+        self.keys = keys
+        self.meta = {'rows': rows, 'days': days, 'columns': columns}
+        with open(self.keys_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(keys) + ('\n' if keys else ''))
+        self._write_meta()
+
+    def _write_meta(self):
+        self.meta['file'] = self._file_state()
+        self.meta['key_version'] = KEY_VERSION
+        tmp_path = self.meta_path.with_name(self.meta_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _append_csv(self, path, df, columns):
+        write_header = not path.exists() or path.stat().st_size == 0
+        df.reindex(columns=columns).to_csv(
+            path, mode='a', header=write_header, index=False, encoding='utf-8', quoting=csv.QUOTE_MINIMAL
+        )
+
+    # expired rows go to archive/<risk_type>_sentiment_archive_<YYYY-MM>.csv, appended, never rewritten
+    # the archive has its own key index so a late duplicate of an archived row isn't archived twice
+    def _archive_rows(self, df, dates):
+        if df.empty or not self.archive:
+            return 0
+        if self._archived_keys is None:
+            self._load_archived_keys()
+        keys = pd.Series(_keys_for(df), index=df.index)
+        fresh = ~keys.isin(self._archived_keys) & ~keys.duplicated()
+        df, dates, keys = df[fresh], dates[fresh], keys[fresh]
+        if df.empty:
+            return 0
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.archive_keys_path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(keys) + '\n')
+        self._archived_keys.update(keys)
+        for month, part in df.groupby(dates.dt.strftime('%Y-%m')):
+            archive_path = self.archive_dir / f'{self.risk_type}_sentiment_archive_{month}.csv'
+            columns = list(pd.read_csv(archive_path, nrows=0).columns) if archive_path.exists() else list(part.columns)
+            self._append_csv(archive_path, part, columns)
+        return len(df)
+
+    def _load_archived_keys(self):
+        self._archived_keys = set()
+        version_path = self.archive_keys_path.with_suffix('.version')
+        current = version_path.exists() and version_path.read_text().strip() == str(KEY_VERSION)
+        if current and self.archive_keys_path.exists():
+            with open(self.archive_keys_path, encoding='utf-8') as f:
+                self._archived_keys = set(f.read().split())
+            return
+        # keys from an older row_key - rebuild from the partitions themselves (once)
+        partitions = sorted(self.archive_dir.glob(f'{self.risk_type}_sentiment_archive_*.csv'))
+        for path in partitions:
+            for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=READ_CHUNK_ROWS, encoding='utf-8'):
+                self._archived_keys.update(_keys_for(chunk))
+        if partitions:
+            print(f"Rebuilt archive key index from {len(partitions)} partitions")
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.archive_keys_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self._archived_keys) + ('\n' if self._archived_keys else ''))
+        version_path.write_text(str(KEY_VERSION))
+
+    # new columns in the output can't be appended under the old header - rewrite once with the wider schema
+    def _migrate_columns(self, columns):
+        print(f"Output columns changed - rewriting {self.csv_path} once with the new header")
+        existing = pd.read_csv(self.csv_path, dtype=str, keep_default_na=False, encoding='utf-8')
+        existing.reindex(columns=columns).to_csv(
+            self.csv_path, index=False, encoding='utf-8', quoting=csv.QUOTE_MINIMAL
+        )
+        self.meta['columns'] = columns
+
+    # streaming rewrite that keeps current rows and moves expired ones to the archive partitions
+    def _compact(self, cutoff):
+        tmp_path = self.csv_path.with_name(self.csv_path.name + '.tmp')
+        keys = set()
+        days = {}
+        rows = 0
+        archived = 0
+        columns = self.meta['columns']
+        pd.DataFrame(columns=columns).to_csv(tmp_path, index=False, encoding='utf-8')
+        for chunk in pd.read_csv(self.csv_path, dtype=str, keep_default_na=False,
+                                 chunksize=READ_CHUNK_ROWS, encoding='utf-8'):
+            dates = pd.to_datetime(chunk['PUBLISHED_DATE'], errors='coerce')
+            current = chunk[dates >= cutoff]  # unparseable dates are dropped, as before
+            self._append_csv(tmp_path, current, columns)
+            archived += self._archive_rows(chunk[dates < cutoff], dates[dates < cutoff])
+            keys.update(_keys_for(current))
+            _count_days(days, dates[dates >= cutoff])
+            rows += len(current)
+        os.replace(tmp_path, self.csv_path)
+        self.keys = keys
+        self.meta['rows'] = rows
+        self.meta['days'] = days
+        with open(self.keys_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(keys) + ('\n' if keys else ''))
+        print(f"Compacted {self.csv_path}: kept {rows} records, archived {archived}")
+
+    # retention - expired rows are only counted (meta days), so this reads the csv only when it compacts;
+    # force compacts whenever anything has expired, otherwise once enough has to be worth a rewrite
+    def _expire(self, cutoff, force=False):
+        cutoff_day = cutoff.strftime('%Y-%m-%d')
+        expired = sum(count for day, count in self.meta['days'].items() if day < cutoff_day)
+        if expired and (force or expired >= COMPACT_EXPIRED_FRACTION * self.meta['rows']):
+            self._compact(cutoff)
+
+    # compaction without new rows - the publish step when no chunk had any
+    def expire(self, force=False):
+        self._load()
+        if not self.csv_path.exists():
+            return 0
+        self._expire(dt.datetime.now() - dt.timedelta(days=RETENTION_DAYS), force)
+        self._write_meta()
+        return self.meta['rows']
+
+    # returns the number of records now in the main csv
+    def save(self, df, compact=False):
+        self._load()
+        cutoff = dt.datetime.now() - dt.timedelta(days=RETENTION_DAYS)
+
+        df = df.copy()
+        dates = pd.to_datetime(df['PUBLISHED_DATE'], errors='coerce')
+        df['PUBLISHED_DATE'] = dates.dt.strftime(DATE_FORMAT)
+        df['_KEY'] = _keys_for(df)
+        new_mask = dates.notna() & ~df['_KEY'].isin(self.keys) & ~df['_KEY'].duplicated()
+        df, dates = df[new_mask], dates[new_mask]
+        new_keys = df.pop('_KEY')
+        print(f"{len(df)} new records after dedup against {len(self.keys)} indexed keys")
+
+        current_mask = dates >= cutoff
+        current_df = df[current_mask]
+        archived = self._archive_rows(df[~current_mask], dates[~current_mask])
+
+        columns = self.meta['columns']
+        if columns is None:
+            columns = list(df.columns)
+            self.meta['columns'] = columns
+        elif set(df.columns) - set(columns):
+            self._migrate_columns(columns + [c for c in df.columns if c not in columns])
+            columns = self.meta['columns']
+
+        if not current_df.empty:
+            self._append_csv(self.csv_path, current_df, columns)
+            current_keys = new_keys[current_mask]
+            with open(self.keys_path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(current_keys) + '\n')
+            self.keys.update(current_keys)
+            _count_days(self.meta['days'], dates[current_mask])
+            self.meta['rows'] += len(current_df)
+        elif not self.csv_path.exists():
+            pd.DataFrame(columns=columns).to_csv(self.csv_path, index=False, encoding='utf-8')
+            self.keys_path.touch()
+        print(f"Appended {len(current_df)} records to {self.csv_path}")
+        if archived:
+            print(f"Archived {archived} records older than the retention window")
+
+        self._expire(cutoff, force=compact)
+        self._write_meta()
+        return self.meta['rows']
+
+# publish step: fold the chunk runs' csvs into the main csv through the store, so the main csv keeps its
+# rolling window (dedup, retention and archiving as in a normal save) instead of being replaced by one day
+# expired rows are always compacted out here, so the committed csv never holds rows past the window
+def merge_chunks(csv_path, risk_type, chunk_paths):
+    store = AppendOnlyCsvStore(csv_path, risk_type)
+    frames = [pd.read_csv(path, dtype=str, keep_default_na=False, encoding='utf-8')
+              for path in chunk_paths if Path(path).stat().st_size]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        print(f"No chunk rows to merge into {csv_path}")
+        return store.expire(force=True)
+    df = pd.concat(frames, ignore_index=True)
+    print(f"Merging {len(df)} rows from {len(frames)} chunk csvs into {csv_path}")
+    return store.save(df, compact=True)
+
+# python storage.py output/enterprise_risks_online_sentiment.csv enterprise output/enterprise/*.csv
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) < 4:
+        sys.exit("usage: python storage.py <main csv> <risk type> <chunk csv>...")
+    records = merge_chunks(sys.argv[1], sys.argv[2], sys.argv[3:])
+    if records is not None:
+        print(f"Main CSV now holds {records} records")
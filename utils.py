@@ -1,12 +1,15 @@
 # shared utilities for enterprise and emerging risks scripts
 # handles common functionality for both processing
 
+import asyncio
 import requests
 import random
 import re
 import time
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from bs4 import BeautifulSoup
 import pandas as pd
@@ -17,11 +20,36 @@ from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from urllib.parse import urlparse
-import csv
+from googlenewsdecoder import new_decoderv1
+from email.utils import parsedate_to_datetime
+from cache import get_decode_cache, get_rss_cache
+from storage import AppendOnlyCsvStore
+from run_report import run_stats
+from source_registry import SourceRegistry
+import cassette
+from fetch_engine import create_fetch_engine
+from canonical_url import canonicalize_url, usable_canonical
 
 # Load environment variables
 DEBUG_MODE = os.getenv('DEBUG_MODE', 'false').lower() == 'true'
 MAX_ARTICLES_PER_TERM = int(os.getenv('MAX_ARTICLES_PER_TERM', '20'))
+KEYBERT_BATCH_SIZE = int(os.getenv('KEYBERT_BATCH_SIZE', '16'))  # docs per embedding batch
+GOOGLE_NEWS_RSS_URL = os.getenv('GOOGLE_NEWS_RSS_URL', 'https://news.google.com/rss/search')
+GOOGLE_TARGET_QPS = float(os.getenv('GOOGLE_TARGET_QPS', '2.0'))  # starting pace for all google requests (rss + decoder)
+GOOGLE_MIN_QPS = float(os.getenv('GOOGLE_MIN_QPS', '0.2'))
+GOOGLE_MAX_QPS = float(os.getenv('GOOGLE_MAX_QPS', '8.0'))
+GOOGLE_MAX_THROTTLE_RETRIES = int(os.getenv('GOOGLE_MAX_THROTTLE_RETRIES', '4'))
+# pipeline stage workers - see pipeline.py
+TERM_WORKERS = int(os.getenv('TERM_WORKERS', '3'))  # rss fetches in flight - low to avoid google limits
+DECODE_WORKERS = int(os.getenv('DECODE_WORKERS', '3'))  # google decodes in flight (paced by the rate limiter)
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', '9'))  # publisher downloads in flight
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', '2'))  # newspaper html parsing
+MAX_CONNECTIONS_PER_HOST = int(os.getenv('MAX_CONNECTIONS_PER_HOST', '2'))  # politeness cap per publisher
+# rss pagination - pages per term, results per page, and pages fetched ahead of the one being triaged
+RSS_PAGES = int(os.getenv('RSS_PAGES', '1'))
+RSS_PAGE_SIZE = int(os.getenv('RSS_PAGE_SIZE', '10'))
+RSS_PAGE_CONCURRENCY = int(os.getenv('RSS_PAGE_CONCURRENCY', '2'))
+RSS_CONDITIONAL_GET = os.getenv('RSS_CONDITIONAL_GET', '1') != '0'  # revalidate rss pages with ETag / Last-Modified
 
 # CHUNKING - disable limit if chunking
 if os.getenv('TERM_START') is not None:
@@ -32,6 +60,15 @@ else:
 class ScraperSession:
     def __init__(self):
         self.session = self._setup_session()
+        if cassette.active_cassette:
+            cassette.active_cassette.install(self.session)  # --record / --replay
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
+        # async publisher downloads (fetch_engine.py), or None for the thread path below
+        self.fetch_engine = create_fetch_engine(MAX_CONNECTIONS_PER_HOST, cassette_active=bool(cassette.active_cassette))
+        # rss validator cache (cache.RssFeedCache) - off while recording or replaying, since a cassette keys
+        # responses by url alone and a 304 would stand for a body it never captured
+        self.rss_cache = get_rss_cache() if RSS_CONDITIONAL_GET and not cassette.active_cassette else None
         self.user_agents = [
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.3.1 Safari/605.1.15',
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:77.0) Gecko/20100101 Firefox/77.0',
@@ -44,11 +81,93 @@ class ScraperSession:
         session = requests.Session()
         retries = Retry(total=3, backoff_factor=1, 
                        status_forcelist=[429, 500, 502, 503, 504])
-        session.mount('https://', HTTPAdapter(max_retries=retries))
+        # one keep-alive pool per host, sized so every download thread can hold a connection
+        adapter = HTTPAdapter(max_retries=retries, pool_connections=100, pool_maxsize=DOWNLOAD_WORKERS)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        # google throttling (429/503) must reach the shared rate limiter instead of being retried blindly here
+        google_parts = urlparse(GOOGLE_NEWS_RSS_URL)
+        google_retries = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 504],
+                               respect_retry_after_header=False)
+        # sized like _rss_page_pool, which has up to RSS_PAGE_CONCURRENCY pages of every term thread in flight -
+        # a smaller pool opens extra connections and throws them away ("Connection pool is full"), losing keep-alive
+        session.mount(f"{google_parts.scheme}://{google_parts.netloc}",
+                      HTTPAdapter(max_retries=google_retries, pool_maxsize=max(TERM_WORKERS * RSS_PAGE_CONCURRENCY, 1)))
         return session
     
     def get_random_headers(self):
         return {'User-Agent': random.choice(self.user_agents)}
+    
+    def _host_slot(self, host):
+        with self._host_slots_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(MAX_CONNECTIONS_PER_HOST)
+            return self._host_slots[host]
+    
+    # download article html through the pooled session so repeat publishers reuse connections (and TLS sessions)
+    # raises requests exceptions on failure / non-2xx, like newspaper's own download does
+    def fetch_html(self, url, timeout=20):
+        host = urlparse(url).netloc.lower()
+        with run_stats.timed('download') as call:
+            with self._host_slot(host):
+                response = self.session.get(url, headers=self.get_random_headers(), timeout=timeout)
+            call.bytes = len(response.content)
+            response.raise_for_status()
+        return html_from_response(response)
+    
+    # RSS CONDITIONAL GET - every rss request revalidates the last response for its url (If-None-Match /
+    # If-Modified-Since); on 304 the items parsed from that response are reused without a body or a parse
+    def fetch_rss_items(self, url):
+        cached = self.rss_cache.get(url) if self.rss_cache else None
+        headers = {}
+        if cached and cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+        with run_stats.timed('rss') as call:
+            response = google_get(self, url, headers=headers)
+            call.bytes = len(response.content)
+            if response.status_code == 304 and cached:
+                self.rss_cache.count(True, not_modified=True)
+                self.rss_cache.touch(url)
+                return cached['items']
+            response.raise_for_status()
+        items = parse_google_news_rss(response.content)
+        if self.rss_cache:
+            etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+            self.rss_cache.count(bool(headers), no_validators=not (etag or last_modified))
+            if etag or last_modified:
+                self.rss_cache.put(url, etag, last_modified, items)
+        return items
+    
+    # fetch_html on the async engine's loop - per-host and global limits are the engine's semaphores
+    async def fetch_html_async(self, url, timeout=20):
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await self.fetch_engine.get(url, headers=self.get_random_headers(), timeout=timeout)
+            response.raise_for_status()
+        except Exception:
+            run_stats.record('download', time.perf_counter() - start, True, len(response.content) if response is not None else 0)
+            raise
+        run_stats.record('download', time.perf_counter() - start, False, len(response.content))
+        # charset sniffing can be slow on big pages - keep it off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, html_from_response, response)
+    
+    def close(self):
+        if self.fetch_engine:
+            self.fetch_engine.close()
+        self.session.close()
+
+# same decoding rules as newspaper's network.get_html - no charset header means let the page decide
+def html_from_response(response):
+    if response.encoding and response.encoding.lower() != 'iso-8859-1':
+        return response.text
+    encodings = requests.utils.get_encodings_from_content(response.text)
+    if encodings:
+        response.encoding = encodings[0]
+        return response.text
+    return response.content  # newspaper sniffs the encoding of raw bytes itself
 
 # download NLTK resources if not already present
 # added POS tagging (averaged_perceptron_tagger) to help in the keyword extraction which fails at times
@@ -60,6 +179,331 @@ def setup_nltk():
             print(f"Downloading NLTK resource: {resource}")
             nltk.download(resource)
 
+# KEYWORD EXTRACTION SERVICE
+# loads the KeyBERT model once per process (instead of once per article) and embeds docs in batches
+class KeywordExtractor:
+    def __init__(self, batch_size=KEYBERT_BATCH_SIZE):
+        self.batch_size = max(batch_size, 1)
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._batch_lock = threading.Lock()  # one batch at a time so threads don't fight over the model
+        self.load_seconds = 0.0
+        self.batch_count = 0
+        self.doc_count = 0
+        self.batch_seconds = 0.0
+
+    def _get_model(self):
+        # lazy load so runs where newspaper finds all keywords never pay for the model
+        with self._load_lock:
+            if self._model is None:
+                load_start = time.perf_counter()
+                from keybert import KeyBERT
+                self._model = KeyBERT()
+                self.load_seconds = time.perf_counter() - load_start
+                print(f"KeyBERT model loaded in {self.load_seconds:.2f}s")
+        return self._model
+
+    def _extract_docs(self, model, docs, top_n):
+        keywords = model.extract_keywords(docs, keyphrase_ngram_range=(1, 2), stop_words='english', top_n=top_n)
+        # keybert unwraps the result when a single doc is passed
+        if len(docs) == 1:
+            keywords = [keywords]
+        return [[kw[0] for kw in doc_keywords] for doc_keywords in keywords]
+
+    # returns one keyword list per text, in input order
+    def extract(self, texts, top_n=5):
+        if not texts:
+            return []
+        model = self._get_model()
+        results = []
+        for i in range(0, len(texts), self.batch_size):
+            batch = texts[i:i + self.batch_size]
+            with self._batch_lock:
+                batch_start = time.perf_counter()
+                try:
+                    batch_keywords = self._extract_docs(model, batch, top_n)
+                except Exception as e:
+                    # one bad doc (e.g. only stop words) fails the whole batch - retry one by one
+                    print(f"    ---KeyBERT batch failed ({e}), retrying per document")
+                    batch_keywords = []
+                    for doc in batch:
+                        try:
+                            batch_keywords.extend(self._extract_docs(model, [doc], top_n))
+                        except Exception:
+                            batch_keywords.append([])
+                elapsed = time.perf_counter() - batch_start
+                self.batch_count += 1
+                self.doc_count += len(batch)
+                self.batch_seconds += elapsed
+            results.extend(batch_keywords)
+            print(f"    - KeyBERT batch: {len(batch)} docs in {elapsed:.2f}s ({len(batch) / max(elapsed, 1e-9):.1f} docs/s)")
+        return results
+
+    def stats(self):
+        return {
+            'model_load_seconds': round(self.load_seconds, 2),
+            'docs': self.doc_count,
+            'batches': self.batch_count,
+            'batch_seconds': round(self.batch_seconds, 2),
+        }
+
+# shared per-process instance - the model itself is only loaded on first use
+keyword_extractor = KeywordExtractor()
+
+# GOOGLE RATE LIMITER
+# one token bucket shared by every thread that talks to google (rss fetches and url decodes)
+# pace adapts with additive increase on success and multiplicative decrease on 429/503 (+ Retry-After)
+class AdaptiveRateLimiter:
+    def __init__(self, qps=GOOGLE_TARGET_QPS, min_qps=GOOGLE_MIN_QPS, max_qps=GOOGLE_MAX_QPS,
+                 increase=0.1, decrease=0.5, burst=2):
+        self.qps = qps
+        self.min_qps = min_qps
+        self.max_qps = max_qps
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.enabled = True
+        self.request_count = 0
+        self.throttle_count = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.qps)
+        self._last = now
+
+    # replayed runs never reach google - no point pacing them
+    def disable(self):
+        self.enabled = False
+
+    # block until `tokens` requests may be sent
+    def acquire(self, tokens=1):
+        if not self.enabled:
+            return
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.request_count += tokens
+                    self.wait_seconds += waited
+                    return
+                wait = max(self._blocked_until - now, (tokens - self._tokens) / self.qps)
+            time.sleep(wait)
+            waited += wait
+
+    def on_success(self):
+        with self._lock:
+            self.qps = min(self.max_qps, self.qps + self.increase)
+
+    # google pushed back - cut the pace and pause everyone until Retry-After (or one interval) has passed
+    def on_throttle(self, retry_after=None):
+        with self._lock:
+            self.qps = max(self.min_qps, self.qps * self.decrease)
+            pause = retry_after if retry_after is not None else 1.0 / self.qps
+            self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+            self._tokens = 0.0
+            self.throttle_count += 1
+        print(f"    ---Google throttled us: pace now {self.qps:.2f} req/s, pausing {pause:.1f}s")
+
+    def stats(self):
+        return {
+            'requests': self.request_count,
+            'throttles': self.throttle_count,
+            'wait_seconds': round(self.wait_seconds, 2),
+            'final_qps': round(self.qps, 2),
+        }
+
+    def print_stats(self):
+        print(f"Google rate limiter: {self.request_count} requests, {self.throttle_count} throttles, "
+              f"{self.wait_seconds:.0f}s waited across threads, final pace {self.qps:.2f} req/s")
+
+google_rate_limiter = AdaptiveRateLimiter()
+
+# Retry-After is either delta-seconds or an HTTP date
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max((retry_at - dt.datetime.now(dt.timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+# GET a google endpoint through the shared limiter, backing off and retrying on 429/503
+def google_get(session, url, limiter=None, headers=None, **kwargs):
+    limiter = limiter or google_rate_limiter
+    for attempt in range(GOOGLE_MAX_THROTTLE_RETRIES + 1):
+        limiter.acquire()
+        response = session.session.get(url, headers=dict(session.get_random_headers(), **(headers or {})), **kwargs)
+        if response.status_code in (429, 503):
+            limiter.on_throttle(parse_retry_after(response.headers.get('Retry-After')))
+            continue
+        limiter.on_success()
+        return response
+    return response  # still throttled - let the caller's raise_for_status report it
+
+# GOOGLE NEWS RSS
+# one request and one parse per page - every field the scrapers need comes from the same <item>
+# (a conditional request through the session's validator cache, see ScraperSession.fetch_rss_items)
+def fetch_google_news_rss(search_term, session, search_days, start=0):
+    url = f"{GOOGLE_NEWS_RSS_URL}?q={search_term}%20when%3A{search_days}d&start={start}"
+    return session.fetch_rss_items(url)
+
+# RSS PAGINATION
+# yields (page, start, items) in page order, keeping up to `concurrency` pages in flight through the shared
+# rate limiter; the caller stops fetching by leaving the loop (pages not yet sent are cancelled)
+# a failed page raises at its turn, an empty page ends the term
+_rss_page_pool = None
+_rss_page_pool_lock = threading.Lock()
+
+def _page_pool():
+    global _rss_page_pool
+    with _rss_page_pool_lock:
+        if _rss_page_pool is None:
+            _rss_page_pool = ThreadPoolExecutor(max_workers=max(TERM_WORKERS * RSS_PAGE_CONCURRENCY, 1),
+                                                thread_name_prefix='rss-page')
+        return _rss_page_pool
+
+def fetch_google_news_rss_pages(search_term, session, search_days, pages=RSS_PAGES, page_size=RSS_PAGE_SIZE,
+                                concurrency=RSS_PAGE_CONCURRENCY):
+    pages = max(pages, 1)
+    if pages == 1 or concurrency <= 1:
+        for page in range(pages):
+            items = fetch_google_news_rss(search_term, session, search_days, page * page_size)
+            run_stats.count('rss_pages_fetched')
+            yield page, page * page_size, items
+            if not items:
+                return
+        return
+    
+    pool = _page_pool()
+    futures = {}
+    next_page = 0
+    try:
+        for page in range(pages):
+            while next_page < pages and next_page < page + concurrency:
+                futures[next_page] = pool.submit(fetch_google_news_rss, search_term, session, search_days,
+                                                 next_page * page_size)
+                next_page += 1
+            items = futures.pop(page).result()
+            run_stats.count('rss_pages_fetched')
+            yield page, page * page_size, items
+            if not items:
+                return
+    finally:
+        for future in futures.values():
+            if future.cancel():
+                run_stats.count('rss_pages_cancelled')
+            else:
+                run_stats.count('rss_pages_unused')  # already fetched or in flight when the term stopped
+
+# returns a list of dicts: title, link, pub_date, guid, source_name, source_url
+def parse_google_news_rss(content):
+    soup = BeautifulSoup(content, 'xml')
+    items = []
+    for item in soup.find_all('item'):
+        source = item.find('source')
+        items.append({
+            'title': item.title.text.strip() if item.title else None,
+            'link': item.link.text.strip() if item.link else None,
+            'pub_date': item.pubDate.text.strip() if item.pubDate else None,
+            'guid': item.guid.text.strip() if item.guid else None,
+            'source_name': source.text.strip() if source else None,
+            'source_url': source.get('url') if source else None,
+        })
+    return items
+
+# RFC-822 pubDate -> aware datetime, e.g. "Mon, 06 Oct 2025 14:00:00 GMT"
+# google always sends this exact GMT shape, so split it directly; anything else goes through the stdlib parser
+RSS_MONTHS = {m: i for i, m in enumerate(('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+
+def parse_rss_date(value):
+    if not value:
+        return None
+    parts = value.split()
+    try:
+        if len(parts) == 6 and parts[5] in ('GMT', 'UTC', '+0000', 'Z') and parts[2] in RSS_MONTHS:
+            hour, minute, second = parts[4].split(':')
+            return dt.datetime(int(parts[3]), RSS_MONTHS[parts[2]], int(parts[1]), int(hour), int(minute), int(second),
+                               tzinfo=dt.timezone.utc)
+    except ValueError:
+        pass
+    try:
+        published = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    return published if published.tzinfo else published.replace(tzinfo=dt.timezone.utc)
+
+# decoded url already in the decode cache, without decoding or touching its counters - for the checks made
+# before deciding to decode; None with a cassette active, so a recording takes the same path its replay
+# will, and a replay depends on the tape alone rather than on the local cache
+def peek_decoded_url(encoded_url):
+    if cassette.active_cassette:
+        return None
+    return get_decode_cache().peek(encoded_url)
+
+# decode a Google News link to the publisher url; returns None if decoding failed
+# hits in the persistent decode cache skip both the network decode and the rate limiter
+# with a cassette active the decoder call is recorded, or served from the cassette without touching the cache
+def decode_google_news_url(encoded_url):
+    cache = get_decode_cache()
+    tape = cassette.active_cassette
+    replaying = tape is not None and tape.replaying
+    decoded_url = None if replaying else cache.get(encoded_url)
+    if decoded_url:
+        if tape:
+            tape.record_decode(encoded_url, {'status': True, 'decoded_url': decoded_url}, 0.0)
+        return decoded_url
+    
+    decode_start = time.perf_counter()
+    try:
+        for attempt in range(GOOGLE_MAX_THROTTLE_RETRIES + 1):
+            # the decoder makes two google requests (article page + batchexecute)
+            google_rate_limiter.acquire(tokens=2)
+            with run_stats.timed('decode') as call:
+                decoded_result = tape.decode(encoded_url, new_decoderv1) if tape else new_decoderv1(encoded_url)
+                call.failed = isinstance(decoded_result, dict) and not decoded_result.get('status')
+            # the decoder swallows http errors into its message - that is the only throttling signal we get
+            if isinstance(decoded_result, dict) and not decoded_result.get('status') and \
+                    re.search(r'\b(429|503)\b', str(decoded_result.get('message', ''))):
+                google_rate_limiter.on_throttle()
+                continue
+            google_rate_limiter.on_success()
+            break
+        
+        # FIXED: Handle both string and dict responses from the decoder
+        if isinstance(decoded_result, dict):
+            if decoded_result.get('status') and 'decoded_url' in decoded_result:
+                decoded_url = decoded_result['decoded_url']
+            else:
+                print(f"    --Skipping: bad dict format: {decoded_result}") # this handles when status is False or missing
+                return None
+        elif isinstance(decoded_result, str):
+            decoded_url = decoded_result
+        else:
+            print(f"    ---Skipping: unexpected decode type: {type(decoded_result)}")
+            return None
+    except Exception as e:
+        print(f"    ---URL decode error: {e}") # if decode failed, then we skip
+        return None
+    finally:
+        cache.add_miss_time(time.perf_counter() - decode_start)
+    
+    # failures are not cached so they get retried next run
+    if not replaying:
+        cache.put(encoded_url, decoded_url)
+    return decoded_url
+
 # extract domain name from URL
 def get_source_name(url):
     from urllib.parse import urlparse
@@ -85,23 +529,133 @@ def get_source_name(url):
     # default: first part
     return parts[0] if parts else ''
 
+# risk id as the existing links index keys it - ints when it parses, so "2" and 2.0 match
+def _risk_key(risk_id):
+    try:
+        return int(risk_id)
+    except (TypeError, ValueError):
+        return str(risk_id)
+
+# EXISTING LINKS INDEX
+# (risk_id, link) pairs already in the output csv - checked before decode/download instead of at save time
+# keyed per risk because the same link may still be new for a different risk
+class ExistingLinkIndex:
+    def __init__(self):
+        self._keys = set()
+        self._lock = threading.Lock()
+    
+    def add(self, risk_id, url):
+        with self._lock:
+            self._keys.add((_risk_key(risk_id), canonicalize_url(url)))
+    
+    def contains(self, risk_id, url):
+        return (_risk_key(risk_id), canonicalize_url(url)) in self._keys
+    
+    # [risk_id, link] pairs - lets a recorded run keep the exact index it started with
+    def pairs(self):
+        with self._lock:
+            return [[risk, link] for risk, link in self._keys]
+    
+    @classmethod
+    def from_pairs(cls, pairs):
+        index = cls()
+        for risk_id, url in pairs:
+            index.add(risk_id, url)
+        return index
+    
+    # LINK may be the page's rel=canonical url, so the fetched url (SOURCE_URL) is indexed too - the decoded
+    # google link of an already saved article then still matches before decode
+    def load_csv(self, csv_path):
+        df = pd.read_csv(csv_path, usecols=lambda x: x in ('RISK_ID', 'LINK', 'SOURCE_URL'), encoding="utf-8")
+        df['RISK_ID'] = pd.to_numeric(df['RISK_ID'], errors='coerce')
+        df = df.dropna(subset=['RISK_ID', 'LINK'])
+        risk_ids = df['RISK_ID'].astype(int)
+        with self._lock:
+            self._keys.update(zip(risk_ids, df['LINK'].map(canonicalize_url)))
+            if 'SOURCE_URL' in df:
+                fetched = df['SOURCE_URL'].notna()
+                self._keys.update(zip(risk_ids[fetched], df.loc[fetched, 'SOURCE_URL'].map(canonicalize_url)))
+        return len(df)
+    
+    def __len__(self):
+        return len(self._keys)
+
+# RUN-WIDE ARTICLE REGISTRY
+# one download + parse per url per process, shared by every term, risk and risk list
+# concurrent requests for the same url wait for the first fetch instead of starting their own
+class ArticleRegistry:
+    def __init__(self):
+        self._entries = {}  # link key -> parsed content dict, or None if the fetch failed
+        self._inflight = {}  # link key -> event set when the fetch finishes
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.reuses = 0
+        self.aliases = 0
+    
+    # returns (content, False) when the url is already done (waiting if another thread is fetching it),
+    # or (None, True) when the caller now owns the fetch and must call publish() - even on failure
+    def claim(self, url, timeout=300):
+        key = canonicalize_url(url)
+        with self._lock:
+            if key in self._entries:
+                self.reuses += 1
+                return self._entries[key], False
+            event = self._inflight.get(key)
+            if event is None:
+                self._inflight[key] = threading.Event()
+                return None, True
+        
+        event.wait(timeout)
+        with self._lock:
+            self.reuses += 1
+            return self._entries.get(key), False
+    
+    # the page's rel=canonical (content['canonical_link']) is registered too when it's usable (see
+    # canonical_url.usable_canonical), so a later claim for that url - or any variant of it - reuses this download
+    def publish(self, url, content):
+        key = canonicalize_url(url)
+        canonical = usable_canonical(url, content.get('canonical_link')) if content else None
+        alias = canonicalize_url(canonical) if canonical else None
+        with self._lock:
+            self._entries[key] = content
+            if alias and alias != key and alias not in self._entries and alias not in self._inflight:
+                self._entries[alias] = content
+                self.aliases += 1
+            event = self._inflight.pop(key, None)
+            self.fetches += 1
+        if event:
+            event.set()
+    
+    def stats(self):
+        return {'downloads': self.fetches, 'reuses': self.reuses, 'canonical_aliases': self.aliases}
+
+    def print_stats(self):
+        print(f"Article registry: {self.fetches} downloads, {self.reuses} reused across terms, "
+              f"{self.aliases} rel=canonical aliases")
+
+# shared per-process instance so enterprise and emerging runs in one process also share downloads
+article_registry = ArticleRegistry()
+
 # Dedup and load existing links from CSV
+# chunked runs write to *_chunk_N.csv, so the main output csv is loaded too - otherwise every chunk starts empty
 def load_existing_links(csv_path):
+    index = ExistingLinkIndex()
     if DEBUG_MODE:
         print("DEBUG: Skipping existing links check")
-        return set()
-    
-    if not os.path.exists(csv_path):
-        return set()
+        return index
     
-    try:
-        df = pd.read_csv(csv_path, usecols=lambda x: 'LINK' in x, encoding="utf-8")
-        links = set(df["LINK"].dropna().str.lower().str.strip())
-        print(f"Loaded {len(links)} existing links")
-        return links
-    except Exception as e:
-        print(f"Warning: Could not load existing links: {e}")
-        return set()
+    csv_path = Path(csv_path)
+    main_path = csv_path.with_name(re.sub(r'_chunk_\d+(?=\.csv$)', '', csv_path.name))
+    for path in dict.fromkeys([main_path, csv_path]):
+        if not path.exists():
+            continue
+        try:
+            rows = index.load_csv(path)
+            print(f"Loaded {rows} existing links from {path}")
+        except Exception as e:
+            print(f"Warning: Could not load existing links from {path}: {e}")
+    print(f"Existing links index: {len(index)} (risk, link) pairs")
+    return index
 
 # output directory setup
 def setup_output_dir(output_csv):
@@ -125,45 +679,19 @@ def load_search_terms(encoded_csv_path, risk_id_col):
         sys.exit(1)
 
 # save results to CSV with deduplication and archiving
+# append-only: cost scales with the day's new rows, not with the size of the history (see storage.py)
 def save_results(df, output_path, risk_type):
     # save results to csv with deduplication per risk_id
     print(f"Saving {len(df)} {risk_type} articles to {output_path}")
     
-    # load existing data
-    if os.path.exists(output_path):
-        existing_df = pd.read_csv(output_path, parse_dates=['PUBLISHED_DATE'], encoding='utf-8')
-        print(f"Loaded existing CSV with {len(existing_df)} records")
-    else:
-        existing_df = pd.DataFrame()
-        print("No existing CSV found - starting fresh")
-    
-    # combine and dedup by risk_id, title, and link
-    combined_df = pd.concat([existing_df, df], ignore_index=True)
-    combined_df = combined_df.drop_duplicates(subset=['RISK_ID', 'TITLE', 'LINK'], keep='first')
-    
-    # 4-month rolling window
-    cutoff_date = dt.datetime.now() - dt.timedelta(days=4 * 30)
-    combined_df['PUBLISHED_DATE'] = pd.to_datetime(combined_df['PUBLISHED_DATE'], errors='coerce')
-    
-    current_df = combined_df[combined_df['PUBLISHED_DATE'] >= cutoff_date].copy()
-    old_df = combined_df[combined_df['PUBLISHED_DATE'] < cutoff_date].copy()
-    
-    # save current data
-    current_df.sort_values(by='PUBLISHED_DATE', ascending=False).to_csv(
-        output_path, index=False, encoding='utf-8', quoting=csv.QUOTE_MINIMAL
-    )
-    
-    print(f"Updated main CSV with {len(current_df)} records")
-    
     # Archive old data (skip in debug)
-    if not DEBUG_MODE and not old_df.empty:
-        archive_path = Path(output_path).parent / f'{risk_type}_sentiment_archive.csv'
-        old_df.sort_values(by='PUBLISHED_DATE').to_csv(
-            archive_path, index=False, encoding='utf-8', quoting=csv.QUOTE_MINIMAL
-        )
-        print(f"Archived {len(old_df)} records")
+    store = AppendOnlyCsvStore(output_path, risk_type, archive=not DEBUG_MODE)
+    with run_stats.timed('save_results') as call:
+        record_count = store.save(df)
+        call.bytes = Path(output_path).stat().st_size if Path(output_path).exists() else 0
     
-    return len(current_df)
+    print(f"Main CSV now holds {record_count} records")
+    return record_count
 
 # print debug info
 def print_debug_info(script_name, risk_type, start_time):
@@ -177,22 +705,39 @@ def print_debug_info(script_name, risk_type, start_time):
     print(f"Working directory: {os.getcwd()}")
     print("*" * 50)
 
-# load whitelist and source type lists
-def load_source_lists():
-    try:
-        # load source and type data
-        source_df = pd.read_csv('data/source_and_type.csv', encoding='utf-8')
-        whitelist = set(source_df[source_df['CREDIBILITY_TYPE'] == 'Mainstream']['SOURCE_NAME'].str.lower().str.strip())
-        paywalled = set(source_df[source_df['IS_PAYWALLED'] == 1]['SOURCE_NAME'].str.lower().str.strip())
-        credibility_map = dict(zip(source_df['SOURCE_NAME'].str.lower().str.strip(), source_df['CREDIBILITY_TYPE']))
-        
-        print(f"Loaded {len(whitelist)} whitelist sources")
-        print(f"Loaded {len(paywalled)} paywalled sources")
-        print(f"Loaded {len(credibility_map)} credibility mappings")
-        return whitelist, paywalled, credibility_map
-    except Exception as e:
-        print(f"Warning: Could not load source lists: {e}")
-        return set(), set(), {}
+# load every publisher list (blocklist, allowlist, paywall, credibility, whitelist) - see source_registry.py
+def load_source_lists(data_dir='data'):
+    return SourceRegistry(data_dir)
+
+# TRIAGE SCORE
+# ranks rss items from metadata alone so only the best MAX_ARTICLES_PER_TERM per term are decoded, downloaded and parsed
+# title match (0-4) + google position (0-2) + source credibility (0-2), minus a little for paywalls
+TRIAGE_STOP_WORDS = {'the', 'and', 'for', 'with', 'from', 'that', 'this', 'are', 'was', 'has', 'its', 'into', 'over'}
+TRIAGE_CREDIBILITY_POINTS = {'Mainstream': 2, 'Domain': 1}
+
+def calculate_triage_score(title, search_term, google_index, credibility_type=None, paywalled=False, page_size=100):
+    title_lower = str(title).lower()
+    term_lower = str(search_term).lower().strip('"')
+    
+    # title match - the whole phrase, else the share of its words
+    words = [w for w in re.findall(r'[a-z0-9]+', term_lower) if len(w) > 2 and w not in TRIAGE_STOP_WORDS]
+    if term_lower and term_lower in title_lower:
+        title_score = 4.0
+    elif words:
+        title_score = 3.0 * sum(1 for w in words if re.search(rf'\b{re.escape(w)}', title_lower)) / len(words)
+    else:
+        title_score = 0.0
+    
+    # google position - google's own relevance ranking, linear from 2 at the top to 0 at the end of the feed
+    position_score = 2.0 * max(page_size - (google_index or page_size), 0) / max(page_size - 1, 1)
+    
+    source_score = TRIAGE_CREDIBILITY_POINTS.get(credibility_type, 0) - (0.5 if paywalled else 0)
+    return round(title_score + position_score + source_score, 3)
+
+# relevance test shared by the quality score and the or-batch attribution (query_planner.py):
+# the search term appears, case-insensitively, in the text
+def search_term_matches(term, text):
+    return re.search(re.escape(str(term).lower()), text) is not None
 
 # calculate quality score for an article
 def calculate_quality_score(title, summary, source_url, search_terms, whitelist):
@@ -207,7 +752,7 @@ def calculate_quality_score(title, summary, source_url, search_terms, whitelist)
     text = f"{title_lower} {summary_lower}"
     
     # check relevance to search terms
-    relevant_terms = sum(1 for term in search_terms if re.search(re.escape(str(term).lower()), text))
+    relevant_terms = sum(1 for term in search_terms if search_term_matches(term, text))
     scores['relevance'] = min(relevant_terms, 2)  # cap at 2
     
     # recency (you'll need to pass publish date)